@@ -0,0 +1,20 @@
+"""cached flags on messages and usage logs"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_cached_flags"
+down_revision = "0001_initial"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("messages", sa.Column("cached", sa.Boolean(), nullable=False, server_default=sa.text("false")))
+    op.add_column("usage_logs", sa.Column("cached", sa.Boolean(), nullable=False, server_default=sa.text("false")))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("usage_logs") as batch_op:
+        batch_op.drop_column("cached")
+    with op.batch_alter_table("messages") as batch_op:
+        batch_op.drop_column("cached")
@@ -0,0 +1,19 @@
+"""rolling conversation summary"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_conversation_summary"
+down_revision = "0002_cached_flags"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("conversations", sa.Column("summary", sa.Text(), nullable=False, server_default=""))
+    op.add_column("conversations", sa.Column("summary_message_id", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("conversations") as batch_op:
+        batch_op.drop_column("summary_message_id")
+        batch_op.drop_column("summary")
@@ -0,0 +1,39 @@
+"""daily usage rollup"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_usage_daily"
+down_revision = "0003_conversation_summary"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "usage_daily",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("model", sa.String(length=120), nullable=False),
+        sa.Column("requests", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("prompt_tokens", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("completion_tokens", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("total_tokens", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("estimated_cost_usd", sa.Numeric(), nullable=False, server_default="0"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "day", "model"),
+    )
+    # The usage writer buckets by UTC date. Postgres' DATE() follows the session time zone, so convert first;
+    # SQLite stores and compares timestamps in UTC already.
+    day = "DATE(created_at AT TIME ZONE 'UTC')" if op.get_bind().dialect.name == "postgresql" else "DATE(created_at)"
+    op.execute(
+        f"""
+        INSERT INTO usage_daily (user_id, day, model, requests, prompt_tokens, completion_tokens, total_tokens, estimated_cost_usd)
+        SELECT user_id, {day}, model, COUNT(*), SUM(prompt_tokens), SUM(completion_tokens), SUM(total_tokens), SUM(estimated_cost_usd)
+        FROM usage_logs
+        GROUP BY user_id, {day}, model
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("usage_daily")
@@ -0,0 +1,40 @@
+"""composite indexes for the hot chat and usage queries"""
+from alembic import op
+
+revision = "0005_query_indexes"
+down_revision = "0004_usage_daily"
+branch_labels = None
+depends_on = None
+
+# Single-column indexes that the composites below make redundant. The *_id ones duplicate the
+# primary keys; the foreign-key ones exist only on databases built with metadata.create_all.
+REDUNDANT_INDEXES = {
+    "users": ["ix_users_id"],
+    "conversations": ["ix_conversations_id", "ix_conversations_user_id"],
+    "messages": ["ix_messages_id", "ix_messages_conversation_id"],
+    "usage_logs": ["ix_usage_logs_id", "ix_usage_logs_user_id"],
+}
+
+
+def upgrade() -> None:
+    op.create_index("ix_conversations_user_updated", "conversations", ["user_id", "updated_at"])
+    op.create_index("ix_messages_conversation_created", "messages", ["conversation_id", "created_at", "id"])
+    op.create_index(
+        "ix_usage_logs_user_created",
+        "usage_logs",
+        ["user_id", "created_at"],
+        postgresql_include=["model", "prompt_tokens", "completion_tokens", "total_tokens", "estimated_cost_usd"],
+    )
+    for table, names in REDUNDANT_INDEXES.items():
+        for name in names:
+            op.drop_index(name, table_name=table, if_exists=True)
+
+
+def downgrade() -> None:
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_conversations_id", "conversations", ["id"])
+    op.create_index("ix_messages_id", "messages", ["id"])
+    op.create_index("ix_usage_logs_id", "usage_logs", ["id"])
+    op.drop_index("ix_usage_logs_user_created", table_name="usage_logs")
+    op.drop_index("ix_messages_conversation_created", table_name="messages")
+    op.drop_index("ix_conversations_user_updated", table_name="conversations")
@@ -0,0 +1,18 @@
+"""add id to the conversation list index for keyset pagination"""
+from alembic import op
+
+revision = "0006_conversation_keyset_index"
+down_revision = "0005_query_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Pages are keyed on (updated_at, id); with id in the index the tiebreak needs no extra sort.
+    op.drop_index("ix_conversations_user_updated", table_name="conversations")
+    op.create_index("ix_conversations_user_updated", "conversations", ["user_id", "updated_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_conversations_user_updated", table_name="conversations")
+    op.create_index("ix_conversations_user_updated", "conversations", ["user_id", "updated_at"])
@@ -2,21 +2,33 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import TokenError, create_access_token, create_refresh_token, decode_token, get_password_hash, verify_password
+from app.core.admission import AdmissionRejected
+from app.core.rate_limit import retry_after_header
+from app.core.security import TokenError, create_access_token, create_refresh_token, decode_token, password_hasher
 from app.db.session import get_db
 from app.models.user import User
 from app.schemas.auth import RefreshTokenRequest, TokenPair, UserCreate, UserLogin, UserOut
+from app.services.auth_service import access_token_claims
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
+def hashing_busy(exc: AdmissionRejected) -> HTTPException:
+    return HTTPException(status_code=503, detail="Too many sign-ins in progress. Please try again shortly.", headers=retry_after_header(exc.retry_after))
+
+
 @router.post("/signup", response_model=UserOut)
 async def signup(payload: UserCreate, db: AsyncSession = Depends(get_db)):
+    # Hash before touching the database so no transaction stays open during the slow part.
+    try:
+        hashed_password = await password_hasher.hash(payload.password)
+    except AdmissionRejected as exc:
+        raise hashing_busy(exc) from exc
+
     exists = await db.execute(select(User).where(User.email == payload.email))
     if exists.scalar_one_or_none():
         raise HTTPException(status_code=400, detail="Email already exists")
-
-    user = User(email=payload.email, full_name=payload.full_name, hashed_password=get_password_hash(payload.password))
+    user = User(email=payload.email, full_name=payload.full_name, hashed_password=hashed_password)
     db.add(user)
     await db.commit()
     await db.refresh(user)
@@ -27,10 +39,16 @@ async def signup(payload: UserCreate, db: AsyncSession = Depends(get_db)):
 async def login(payload: UserLogin, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.email == payload.email))
     user = result.scalar_one_or_none()
-    if not user or not verify_password(payload.password, user.hashed_password):
+    # Release the connection before verifying; the loaded row is all that is needed from here on.
+    await db.close()
+    try:
+        valid = user is not None and await password_hasher.verify(payload.password, user.hashed_password)
+    except AdmissionRejected as exc:
+        raise hashing_busy(exc) from exc
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    return TokenPair(access_token=create_access_token(str(user.id)), refresh_token=create_refresh_token(str(user.id)))
+    return TokenPair(access_token=create_access_token(str(user.id), access_token_claims(user)), refresh_token=create_refresh_token(str(user.id)))
 
 
 @router.post("/refresh", response_model=TokenPair)
@@ -46,4 +64,4 @@ async def refresh(payload: RefreshTokenRequest, db: AsyncSession = Depends(get_d
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
-    return TokenPair(access_token=create_access_token(str(user.id)), refresh_token=create_refresh_token(str(user.id)))
+    return TokenPair(access_token=create_access_token(str(user.id), access_token_claims(user)), refresh_token=create_refresh_token(str(user.id)))
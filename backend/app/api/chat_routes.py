@@ -1,38 +1,47 @@
-import asyncio
-import json
+import hmac
 import time
-from collections import defaultdict, deque
+from contextlib import aclosing
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from fastapi.responses import StreamingResponse
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.llm_client import LLMClient
+from app.core.admission import AdmissionRejected
+from app.core.circuit_breaker import CircuitOpen
+from app.core.llm_client import LLMClient, model_label
 from app.core.config import get_settings
-from app.db.session import AsyncSessionLocal, get_db
+from app.core.metrics import rate_limit_rejections, stream_inter_token, stream_tokens_per_second, stream_ttft
+from app.core.rate_limit import rate_limiter, retry_after_header
+from app.core.sse import DONE_FRAME, coalesce_chunks, event_frame, token_frame
+from app.db.session import get_db, get_read_db, get_replica_db
 from app.models.chat import Conversation, Message
-from app.models.usage import UsageLog
-from app.models.user import User
-from app.schemas.chat import ChatHistoryResponse, ChatSendRequest, ChatSendResponse, ConversationCreate, ConversationOut, ConversationUpdate
-from app.services.auth_service import get_current_user
+from app.schemas.chat import ChatHistoryResponse, ChatSendRequest, ChatSendResponse, ConversationCreate, ConversationOut, ConversationUpdate, MessageOut
+from app.services.auth_service import UserSnapshot, get_current_user
+from app.services.context_service import build_context_messages, schedule_summary_update
+from app.services.conversation_cache import conversation_windows
+from app.services.export_service import export_ndjson, gzip_chunks
+from app.services.pagination import keyset_page
+from app.services.turn_writer import PendingTurn, turn_writer
+from app.services.usage_ingest import UsageRecord, usage_ingestor
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 llm_client = LLMClient()
-rate_bucket: dict[int, deque[float]] = defaultdict(deque)
-rate_lock = asyncio.Lock()
 settings = get_settings()
 
 
-async def check_rate_limit(user_id: int) -> None:
-    now = time.time()
-    async with rate_lock:
-        q = rate_bucket[user_id]
-        while q and now - q[0] > 60:
-            q.popleft()
-        if len(q) >= settings.rate_limit_per_minute:
-            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Rate limit exceeded")
-        q.append(now)
+async def check_rate_limit(user_id: int, max_tokens: int | None = None, route: str = "send") -> None:
+    retry_after = await rate_limiter.check(user_id, tokens=max_tokens or settings.default_max_tokens)
+    if retry_after:
+        rate_limit_rejections.inc(route)
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Rate limit exceeded", headers=retry_after_header(retry_after))
+
+
+def request_priority(x_voice_key: str | None = Header(default=None)) -> str:
+    """Admission priority for a chat turn. Clients can't pick it; only the voice assistant's shared key earns "voice"."""
+    if settings.voice_client_key and x_voice_key and hmac.compare_digest(x_voice_key, settings.voice_client_key):
+        return "voice"
+    return "interactive"
 
 
 async def get_conversation_or_404(db: AsyncSession, conversation_id: int, user_id: int) -> Conversation:
@@ -43,16 +52,11 @@ async def get_conversation_or_404(db: AsyncSession, conversation_id: int, user_i
     return conversation
 
 
-async def build_context_messages(db: AsyncSession, conversation: Conversation, user_text: str, max_history: int = 12) -> list[dict[str, str]]:
-    result = await db.execute(select(Message).where(Message.conversation_id == conversation.id).order_by(Message.created_at.desc()).limit(max_history))
-    history = list(reversed(result.scalars().all()))
-    messages = [{"role": "system", "content": conversation.system_prompt}]
-    messages.extend({"role": m.role, "content": m.content} for m in history)
-    messages.append({"role": "user", "content": user_text})
-    return messages
-
-
 def format_llm_error(exc: Exception) -> str:
+    if isinstance(exc, CircuitOpen):
+        return "AI provider is temporarily unavailable. Please try again shortly."
+    if isinstance(exc, AdmissionRejected):
+        return "AI service is busy. Please try again shortly."
     message = str(exc).lower()
     status_code = getattr(exc, "status_code", None)
     if status_code is None:
@@ -75,7 +79,7 @@ def format_llm_error(exc: Exception) -> str:
 
 
 @router.post("/new", response_model=ConversationOut)
-async def create_chat(payload: ConversationCreate, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
+async def create_chat(payload: ConversationCreate, db: AsyncSession = Depends(get_db), user: UserSnapshot = Depends(get_current_user)):
     conversation = Conversation(user_id=user.id, title=payload.title, model=payload.model, system_prompt=payload.system_prompt)
     db.add(conversation)
     await db.commit()
@@ -83,146 +87,253 @@ async def create_chat(payload: ConversationCreate, db: AsyncSession = Depends(ge
     return conversation
 
 
+CONVERSATION_COLUMNS = [getattr(Conversation, name) for name in ConversationOut.model_fields]
+MESSAGE_COLUMNS = [getattr(Message, name) for name in MessageOut.model_fields]
+
+
 @router.get("/list", response_model=list[ConversationOut])
-async def list_chats(db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
-    result = await db.execute(select(Conversation).where(Conversation.user_id == user.id).order_by(Conversation.updated_at.desc()))
-    return list(result.scalars().all())
+async def list_chats(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    before: str | None = None,
+    after: str | None = None,
+    db: AsyncSession = Depends(get_replica_db),
+    user: UserSnapshot = Depends(get_current_user),
+):
+    # Most recently updated first; the cursors for the neighbouring pages travel in the response headers.
+    statement = select(*CONVERSATION_COLUMNS).where(Conversation.user_id == user.id)
+    page = await keyset_page(db, statement, Conversation.updated_at, Conversation.id, limit, before, after)
+    response.headers.update(page.headers())
+    return page.items
 
 
 @router.patch("/{chat_id}", response_model=ConversationOut)
-async def rename_chat(chat_id: int, payload: ConversationUpdate, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
+async def rename_chat(chat_id: int, payload: ConversationUpdate, db: AsyncSession = Depends(get_db), user: UserSnapshot = Depends(get_current_user)):
     conversation = await get_conversation_or_404(db, chat_id, user.id)
     conversation.title = payload.title
     await db.commit()
     await db.refresh(conversation)
+    conversation_windows.update(conversation.id, title=conversation.title)
     return conversation
 
 
 @router.delete("/{chat_id}")
-async def delete_chat(chat_id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
+async def delete_chat(chat_id: int, db: AsyncSession = Depends(get_db), user: UserSnapshot = Depends(get_current_user)):
     conversation = await get_conversation_or_404(db, chat_id, user.id)
     await db.delete(conversation)
     await db.commit()
+    conversation_windows.invalidate(chat_id)
     return {"ok": True}
 
 
 @router.get("/history/{chat_id}", response_model=ChatHistoryResponse)
-async def chat_history(chat_id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
+async def chat_history(
+    chat_id: int,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    before: str | None = None,
+    after: str | None = None,
+    db: AsyncSession = Depends(get_read_db),
+    user: UserSnapshot = Depends(get_current_user),
+):
+    # The first page is the latest messages; pass the returned `before` cursor to load older ones.
     conversation = await get_conversation_or_404(db, chat_id, user.id)
-    result = await db.execute(select(Message).where(Message.conversation_id == chat_id).order_by(Message.created_at.asc()))
-    return ChatHistoryResponse(conversation=conversation, messages=list(result.scalars().all()))
+    await turn_writer.wait(chat_id)
+    statement = select(*MESSAGE_COLUMNS).where(Message.conversation_id == chat_id)
+    page = await keyset_page(db, statement, Message.created_at, Message.id, limit, before, after, newest_first=False)
+    response.headers.update(page.headers())
+    return ChatHistoryResponse(conversation=conversation, messages=page.items, before=page.before, after=page.after)
+
+
+def export_response(user_id: int, filename: str, compress: bool, conversation_id: int | None = None) -> StreamingResponse:
+    body = export_ndjson(user_id, conversation_id, batch_size=settings.export_batch_size)
+    if compress:
+        return StreamingResponse(
+            gzip_chunks(body),
+            media_type="application/gzip",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.ndjson.gz"'},
+        )
+    return StreamingResponse(body, media_type="application/x-ndjson", headers={"Content-Disposition": f'attachment; filename="{filename}.ndjson"'})
 
 
-@router.post("/send", response_model=ChatSendResponse)
-async def send_message(payload: ChatSendRequest, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
-    await check_rate_limit(user.id)
-    conversation = await get_conversation_or_404(db, payload.conversation_id, user.id)
-    context_messages = await build_context_messages(db, conversation, payload.message)
+@router.get("/export")
+async def export_chats(gzip: bool = False, user: UserSnapshot = Depends(get_current_user)):
+    await turn_writer.wait_user(user.id)
+    return export_response(user.id, f"nova-export-{user.id}", gzip)
 
-    user_msg = Message(conversation_id=conversation.id, role="user", content=payload.message)
-    db.add(user_msg)
-    await db.flush()
+
+@router.get("/export/{chat_id}")
+async def export_chat(chat_id: int, gzip: bool = False, db: AsyncSession = Depends(get_read_db), user: UserSnapshot = Depends(get_current_user)):
+    await get_conversation_or_404(db, chat_id, user.id)
+    await turn_writer.wait(chat_id)
+    return export_response(user.id, f"nova-chat-{chat_id}", gzip, conversation_id=chat_id)
+
+
+@router.post("/send", response_model=ChatSendResponse)
+async def send_message(
+    payload: ChatSendRequest,
+    db: AsyncSession = Depends(get_db),
+    user: UserSnapshot = Depends(get_current_user),
+    priority: str = Depends(request_priority),
+):
+    await check_rate_limit(user.id, payload.max_tokens, route="send")
+    await turn_writer.wait(payload.conversation_id)
+    window = await conversation_windows.get_or_load(db, payload.conversation_id, user.id)
+    conversation = window.conversation
+    chosen_model = payload.model or conversation.model
+    context_messages = build_context_messages(conversation, window.messages, payload.message, chosen_model)
+    # Nothing is written until the provider answers; don't hold a connection or transaction across the call.
+    await db.close()
 
     try:
         result = await llm_client.complete(
             context_messages,
-            model=payload.model or conversation.model,
+            model=chosen_model,
             temperature=payload.temperature,
             max_tokens=payload.max_tokens,
+            cache=payload.cache,
+            priority=priority,
         )
+    except AdmissionRejected as exc:
+        raise HTTPException(status_code=503, detail=format_llm_error(exc), headers=retry_after_header(exc.retry_after)) from exc
     except Exception as exc:
-        await db.rollback()
         raise HTTPException(status_code=502, detail=format_llm_error(exc)) from exc
 
-    assistant_msg = Message(
+    usage = UsageRecord(
+        user_id=user.id,
         conversation_id=conversation.id,
-        role="assistant",
-        content=result["content"],
+        model=result["model"],
         prompt_tokens=result["prompt_tokens"],
         completion_tokens=result["completion_tokens"],
         total_tokens=result["total_tokens"],
+        cached=result["cached"],
     )
-    db.add(assistant_msg)
+    changes = {"model": chosen_model}
+    if payload.system_prompt:
+        changes["system_prompt"] = payload.system_prompt
+    updated = await db.execute(update(Conversation).where(Conversation.id == conversation.id, Conversation.user_id == user.id).values(**changes))
+    if updated.rowcount == 0:
+        # The conversation was deleted while the provider was answering; don't leave orphan messages behind.
+        await db.rollback()
+        # Tokens were spent either way; only the link to the vanished conversation is dropped.
+        usage.conversation_id = None
+        await usage_ingestor.submit(usage)
+        raise HTTPException(status_code=404, detail="Conversation not found")
 
-    usage = UsageLog(
-        user_id=user.id,
+    user_msg = Message(conversation_id=conversation.id, role="user", content=payload.message)
+    db.add(user_msg)
+    assistant_msg = Message(
         conversation_id=conversation.id,
-        model=result["model"],
+        role="assistant",
+        content=result["content"],
         prompt_tokens=result["prompt_tokens"],
         completion_tokens=result["completion_tokens"],
         total_tokens=result["total_tokens"],
-        estimated_cost_usd=llm_client.estimate_cost(result["model"], result["total_tokens"]),
+        cached=result["cached"],
     )
-    db.add(usage)
-
-    if payload.system_prompt:
-        conversation.system_prompt = payload.system_prompt
-    conversation.model = payload.model or conversation.model
-
+    db.add(assistant_msg)
     await db.commit()
+    await usage_ingestor.submit(usage)
     await db.refresh(user_msg)
     await db.refresh(assistant_msg)
+    conversation_windows.append(conversation.id, [user_msg, assistant_msg], **changes)
+    schedule_summary_update(llm_client, conversation.id, chosen_model)
     return ChatSendResponse(user_message=user_msg, assistant_message=assistant_msg)
 
 
 @router.post("/send/stream")
-async def send_message_stream(payload: ChatSendRequest, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
-    await check_rate_limit(user.id)
-    conversation = await get_conversation_or_404(db, payload.conversation_id, user.id)
-    context_messages = await build_context_messages(db, conversation, payload.message)
+async def send_message_stream(
+    payload: ChatSendRequest,
+    db: AsyncSession = Depends(get_db),
+    user: UserSnapshot = Depends(get_current_user),
+    priority: str = Depends(request_priority),
+):
+    started = time.perf_counter()
+    await check_rate_limit(user.id, payload.max_tokens, route="stream")
+    await turn_writer.wait(payload.conversation_id)
+    window = await conversation_windows.get_or_load(db, payload.conversation_id, user.id)
+    conversation = window.conversation
+    chosen_model = payload.model or conversation.model
+    context_messages = build_context_messages(conversation, window.messages, payload.message, chosen_model)
+    try:
+        llm_client.admission_check(chosen_model, priority)
+    except AdmissionRejected as exc:
+        raise HTTPException(status_code=503, detail=format_llm_error(exc), headers=retry_after_header(exc.retry_after)) from exc
 
     user_msg = Message(conversation_id=conversation.id, role="user", content=payload.message)
     db.add(user_msg)
     await db.commit()
+    conversation_windows.append(conversation.id, [user_msg])
 
     async def event_gen():
-        full_text = ""
+        parts: list[str] = []
+        used_model = chosen_model
         prompt_tokens = 0
         completion_tokens = 0
         total_tokens = 0
-        chosen_model = payload.model or conversation.model
+        cached = False
+        # Resolved once per stream so each token costs a bisect and an increment, not a label lookup.
+        model_series = model_label(chosen_model)
+        ttft = stream_ttft.labels(model_series)
+        inter_token = stream_inter_token.labels(model_series)
+        first_token_at = last_token_at = 0.0
 
         try:
-            async for chunk in llm_client.stream(context_messages, model=chosen_model, temperature=payload.temperature, max_tokens=payload.max_tokens):
-                if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
-                    delta = chunk.choices[0].delta.content
-                    full_text += delta
-                    yield f"data: {json.dumps({'type': 'token', 'value': delta})}\n\n"
-                if chunk.usage:
-                    prompt_tokens = int(chunk.usage.prompt_tokens or 0)
-                    completion_tokens = int(chunk.usage.completion_tokens or 0)
-                    total_tokens = int(chunk.usage.total_tokens or 0)
-
-            async with AsyncSessionLocal() as write_db:
-                live_conversation = await get_conversation_or_404(write_db, payload.conversation_id, user.id)
-                assistant_msg = Message(
-                    conversation_id=live_conversation.id,
-                    role="assistant",
-                    content=full_text,
-                    prompt_tokens=prompt_tokens,
-                    completion_tokens=completion_tokens,
-                    total_tokens=total_tokens,
-                )
-                write_db.add(assistant_msg)
-
-                usage = UsageLog(
+            chunks = llm_client.stream(context_messages, model=chosen_model, temperature=payload.temperature, max_tokens=payload.max_tokens, cache=payload.cache, priority=priority)
+            async with aclosing(coalesce_chunks(chunks, settings.stream_coalesce_ms / 1000, settings.stream_coalesce_max_chars)) as coalesced:
+                async for chunk in coalesced:
+                    if chunk.content:
+                        parts.append(chunk.content)
+                        now = time.perf_counter()
+                        if first_token_at:
+                            inter_token.observe(now - last_token_at)
+                        else:
+                            first_token_at = now
+                            ttft.observe(now - started)
+                        last_token_at = now
+                        yield token_frame(chunk.content)
+                    if chunk.usage:
+                        prompt_tokens = int(chunk.usage.prompt_tokens or 0)
+                        completion_tokens = int(chunk.usage.completion_tokens or 0)
+                        total_tokens = int(chunk.usage.total_tokens or 0)
+                        used_model = chunk.usage.model or chosen_model
+                        cached = chunk.cached
+
+            if completion_tokens and last_token_at > first_token_at:
+                stream_tokens_per_second.observe(model_series, value=completion_tokens / (last_token_at - first_token_at))
+            changes = {"model": chosen_model}
+            if payload.system_prompt:
+                changes["system_prompt"] = payload.system_prompt
+            assistant_msg = Message(
+                conversation_id=conversation.id,
+                role="assistant",
+                content="".join(parts),
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=total_tokens,
+                cached=cached,
+            )
+            usage = UsageRecord(
+                user_id=user.id,
+                conversation_id=conversation.id,
+                model=used_model,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=total_tokens,
+                cached=cached,
+            )
+            await turn_writer.submit(
+                PendingTurn(
                     user_id=user.id,
-                    conversation_id=live_conversation.id,
-                    model=chosen_model,
-                    prompt_tokens=prompt_tokens,
-                    completion_tokens=completion_tokens,
-                    total_tokens=total_tokens,
-                    estimated_cost_usd=llm_client.estimate_cost(chosen_model, total_tokens),
+                    conversation_id=conversation.id,
+                    message=assistant_msg,
+                    usage=usage,
+                    changes=changes,
+                    on_commit=lambda: schedule_summary_update(llm_client, conversation.id, chosen_model),
                 )
-                write_db.add(usage)
-
-                if payload.system_prompt:
-                    live_conversation.system_prompt = payload.system_prompt
-                live_conversation.model = chosen_model
-
-                await write_db.commit()
-            yield "data: {\"type\":\"done\"}\n\n"
+            )
+            yield DONE_FRAME
         except Exception as exc:
-            yield f"data: {json.dumps({'type': 'error', 'value': format_llm_error(exc)})}\n\n"
+            yield event_frame("error", format_llm_error(exc))
 
     return StreamingResponse(event_gen(), media_type="text/event-stream")
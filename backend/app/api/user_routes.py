@@ -1,33 +1,37 @@
+from datetime import date, datetime, timedelta, timezone
 from decimal import Decimal
+from typing import Literal
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
-from app.models.usage import UsageLog
-from app.models.user import User
+from app.db.session import get_read_db
+from app.models.usage import UsageDaily
 from app.schemas.auth import UserOut
-from app.schemas.usage import UsageSummary
-from app.services.auth_service import get_current_user
+from app.schemas.usage import UsageBreakdown, UsageBucket, UsageSummary
+from app.services.auth_service import UserSnapshot, get_current_user
+from app.services.usage_ingest import usage_ingestor
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
 @router.get("/me", response_model=UserOut)
-async def me(user: User = Depends(get_current_user)):
+async def me(user: UserSnapshot = Depends(get_current_user)):
     return user
 
 
 @router.get("/usage/summary", response_model=UsageSummary)
-async def usage_summary(db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
+async def usage_summary(db: AsyncSession = Depends(get_read_db), user: UserSnapshot = Depends(get_current_user)):
+    if usage_ingestor.has_pending(user.id):
+        await usage_ingestor.flush()
     result = await db.execute(
         select(
-            func.coalesce(func.sum(UsageLog.prompt_tokens), 0),
-            func.coalesce(func.sum(UsageLog.completion_tokens), 0),
-            func.coalesce(func.sum(UsageLog.total_tokens), 0),
-            func.coalesce(func.sum(UsageLog.estimated_cost_usd), Decimal("0.0")),
-        ).where(UsageLog.user_id == user.id)
+            func.coalesce(func.sum(UsageDaily.prompt_tokens), 0),
+            func.coalesce(func.sum(UsageDaily.completion_tokens), 0),
+            func.coalesce(func.sum(UsageDaily.total_tokens), 0),
+            func.coalesce(func.sum(UsageDaily.estimated_cost_usd), Decimal("0.0")),
+        ).where(UsageDaily.user_id == user.id)
     )
     prompt_tokens, completion_tokens, total_tokens, total_cost = result.one()
     return UsageSummary(
@@ -36,3 +40,49 @@ async def usage_summary(db: AsyncSession = Depends(get_db), user: User = Depends
         total_tokens=int(total_tokens),
         total_estimated_cost_usd=total_cost,
     )
+
+
+@router.get("/usage/breakdown", response_model=UsageBreakdown)
+async def usage_breakdown(
+    start: date | None = None,
+    end: date | None = None,
+    group_by: Literal["day", "model", "day_model"] = Query("day"),
+    db: AsyncSession = Depends(get_read_db),
+    user: UserSnapshot = Depends(get_current_user),
+):
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if usage_ingestor.has_pending(user.id):
+        await usage_ingestor.flush()
+
+    keys = {"day": [UsageDaily.day], "model": [UsageDaily.model], "day_model": [UsageDaily.day, UsageDaily.model]}[group_by]
+    result = await db.execute(
+        select(
+            *keys,
+            func.sum(UsageDaily.requests),
+            func.sum(UsageDaily.prompt_tokens),
+            func.sum(UsageDaily.completion_tokens),
+            func.sum(UsageDaily.total_tokens),
+            func.sum(UsageDaily.estimated_cost_usd),
+        )
+        .where(UsageDaily.user_id == user.id, UsageDaily.day >= start, UsageDaily.day <= end)
+        .group_by(*keys)
+        .order_by(*keys)
+    )
+    buckets = []
+    for row in result.all():
+        key = dict(zip((column.key for column in keys), row[: len(keys)]))
+        requests, prompt_tokens, completion_tokens, total_tokens, cost = row[len(keys) :]
+        buckets.append(
+            UsageBucket(
+                **key,
+                requests=int(requests),
+                prompt_tokens=int(prompt_tokens),
+                completion_tokens=int(completion_tokens),
+                total_tokens=int(total_tokens),
+                estimated_cost_usd=cost,
+            )
+        )
+    return UsageBreakdown(start=start, end=end, group_by=group_by, buckets=buckets)
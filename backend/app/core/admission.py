@@ -0,0 +1,197 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.core.config import get_settings
+from app.core.metrics import admission_in_flight, admission_queued, admission_shed, admission_wait
+
+PRIORITIES = {"voice": 0, "interactive": 1, "batch": 2}
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, key: str, retry_after: float, reason: str) -> None:
+        super().__init__(f"{key}: {reason}")
+        self.key = key
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    future: asyncio.Future = field(compare=False)
+    waiting: bool = field(default=True, compare=False)
+
+
+class ModelGate:
+    """Concurrency limit for one provider/model with a bounded, priority-ordered wait queue."""
+
+    def __init__(self, key: str, max_concurrency: int, max_queue: int, queue_timeout: float) -> None:
+        self.key = key
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._heap: list[_Waiter] = []
+        # Live waiters per priority rank. Departed waiters stay in the heap until popped, so it can't be counted directly.
+        self._waiting = [0] * (max(PRIORITIES.values()) + 1)
+        self._seq = itertools.count()
+        self.service_ewma: float | None = None
+        self.admitted = 0
+        self.shed = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        admission_in_flight.labels(key).set_function(lambda: self.in_flight)
+        admission_queued.labels(key).set_function(lambda: self.queued)
+
+    @property
+    def queued(self) -> int:
+        return sum(self._waiting)
+
+    def estimated_wait(self, ahead: int) -> float:
+        if self.service_ewma is None:
+            return 0.0
+        return (ahead + 1) / self.max_concurrency * self.service_ewma
+
+    def _ahead_of(self, rank: int) -> int:
+        return sum(self._waiting[: rank + 1])
+
+    def _leave(self, waiter: _Waiter) -> None:
+        if waiter.waiting:
+            waiter.waiting = False
+            self._waiting[waiter.priority] -= 1
+
+    def check(self, priority: str) -> None:
+        if self.in_flight < self.max_concurrency:
+            return
+        queued = self.queued
+        if queued >= self.max_queue:
+            self.shed += 1
+            admission_shed.inc(self.key, "queue_full")
+            raise AdmissionRejected(self.key, self.estimated_wait(queued), "queue is full")
+        wait = self.estimated_wait(self._ahead_of(PRIORITIES.get(priority, 1)))
+        if wait > self.queue_timeout:
+            self.shed += 1
+            admission_shed.inc(self.key, "deadline")
+            raise AdmissionRejected(self.key, wait, "queue deadline would be exceeded")
+
+    def _record_wait(self, waited: float) -> None:
+        self.admitted += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        admission_wait.observe(self.key, value=waited)
+
+    async def acquire(self, priority: str) -> None:
+        if self.in_flight < self.max_concurrency and not self.queued:
+            self.in_flight += 1
+            self._record_wait(0.0)
+            return
+
+        self.check(priority)
+        future = asyncio.get_running_loop().create_future()
+        waiter = _Waiter(PRIORITIES.get(priority, 1), next(self._seq), future)
+        heapq.heappush(self._heap, waiter)
+        self._waiting[waiter.priority] += 1
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(future, timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._leave(waiter)
+            self.timeouts += 1
+            self.shed += 1
+            admission_shed.inc(self.key, "timeout")
+            raise AdmissionRejected(self.key, self.estimated_wait(self.queued), "timed out waiting in queue") from None
+        except asyncio.CancelledError:
+            self._leave(waiter)
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as the caller went away.
+                self.release(None)
+            raise
+        self._record_wait(time.monotonic() - started)
+
+    def release(self, service_time: float | None) -> None:
+        if service_time is not None:
+            self.service_ewma = service_time if self.service_ewma is None else 0.8 * self.service_ewma + 0.2 * service_time
+        while self._heap:
+            waiter = heapq.heappop(self._heap)
+            if not waiter.future.done():
+                self._leave(waiter)
+                # Hand the slot straight to the next waiter; in_flight is unchanged.
+                waiter.future.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(self.wait_total / self.admitted * 1000, 2) if self.admitted else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 2),
+            "service_ewma_ms": round(self.service_ewma * 1000, 2) if self.service_ewma is not None else None,
+        }
+
+
+class AdmissionController:
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float, model_concurrency: dict[str, int] | None = None) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.model_concurrency = model_concurrency or {}
+        self._gates: dict[str, ModelGate] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrency > 0
+
+    def gate(self, provider: str, model: str) -> ModelGate:
+        key = f"{provider}:{model}"
+        gate = self._gates.get(key)
+        if gate is None:
+            gate = ModelGate(key, self.model_concurrency.get(model, self.max_concurrency), self.max_queue, self.queue_timeout)
+            self._gates[key] = gate
+        return gate
+
+    def check(self, provider: str, model: str, priority: str) -> None:
+        if self.enabled:
+            self.gate(provider, model).check(priority)
+
+    @asynccontextmanager
+    async def slot(self, provider: str, model: str, priority: str) -> AsyncIterator[None]:
+        if not self.enabled:
+            yield
+            return
+        gate = self.gate(provider, model)
+        await gate.acquire(priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            gate.release(time.monotonic() - started)
+
+    def stats(self) -> dict[str, Any]:
+        return {key: gate.stats() for key, gate in self._gates.items()}
+
+
+def _build_controller() -> AdmissionController:
+    settings = get_settings()
+    return AdmissionController(
+        max_concurrency=settings.llm_max_concurrency,
+        max_queue=settings.llm_max_queue,
+        queue_timeout=settings.llm_queue_timeout_seconds,
+        model_concurrency=settings.llm_model_concurrency,
+    )
+
+
+admission_controller = _build_controller()
@@ -0,0 +1,282 @@
+import asyncio
+import random
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import aclosing
+from typing import Any, TypeVar
+
+import httpx
+import openai
+
+from app.core.admission import AdmissionRejected
+from app.core.config import get_settings
+from app.core.metrics import circuit_rejections, circuit_state, circuit_trips, provider_retries, retry_budget_exhausted, retry_budget_tokens
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class CircuitOpen(AdmissionRejected):
+    """Raised without calling the provider while its circuit is open."""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (httpx.TransportError, openai.APIConnectionError)):
+        return True
+    status_code = getattr(exc, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(exc, "response", None), "status_code", None)
+    return status_code is not None and (int(status_code) in RETRYABLE_STATUS or int(status_code) >= 500)
+
+
+class CircuitBreaker:
+    """Failure-ratio breaker over the last ``window`` calls, with a limited number of half-open probes."""
+
+    def __init__(self, key: str, window: int, min_calls: int, failure_ratio: float, open_seconds: float, half_open_probes: int) -> None:
+        self.key = key
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.probes = 0
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self.trips = 0
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        circuit_state.labels(key).set_function(lambda: STATE_VALUES[self.state])
+
+    def _retry_after(self, now: float) -> float:
+        return max(self.opened_at + self.open_seconds - now, 0.0)
+
+    def check(self, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        if self.state == "open" and now - self.opened_at < self.open_seconds:
+            self.rejected += 1
+            circuit_rejections.inc(self.key)
+            raise CircuitOpen(self.key, self._retry_after(now), "circuit is open")
+
+    def allow(self, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        self.check(now)
+        if self.state == "open":
+            self.state = "half_open"
+            self.probes = 0
+        if self.state == "half_open":
+            if self.probes >= self.half_open_probes:
+                self.rejected += 1
+                circuit_rejections.inc(self.key)
+                raise CircuitOpen(self.key, self.open_seconds, "circuit is half-open and probing")
+            self.probes += 1
+
+    def release(self) -> None:
+        # The call ended without telling us anything about provider health (cancelled, client error).
+        if self.state == "half_open":
+            self.probes = max(self.probes - 1, 0)
+
+    def record_success(self) -> None:
+        self.successes += 1
+        if self.state == "half_open":
+            self.state = "closed"
+            self._outcomes.clear()
+        self._outcomes.append(True)
+
+    def record_failure(self, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        self.failures += 1
+        if self.state == "half_open":
+            self._trip(now)
+            return
+        self._outcomes.append(False)
+        failed = self._outcomes.count(False)
+        if len(self._outcomes) >= self.min_calls and failed / len(self._outcomes) >= self.failure_ratio:
+            self._trip(now)
+
+    def _trip(self, now: float) -> None:
+        self.state = "open"
+        self.opened_at = now
+        self.probes = 0
+        self.trips += 1
+        circuit_trips.inc(self.key)
+        self._outcomes.clear()
+
+    def stats(self) -> dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "state": self.state,
+            "trips": self.trips,
+            "successes": self.successes,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "recent_failures": self._outcomes.count(False),
+            "recent_calls": len(self._outcomes),
+            "retry_after": round(self._retry_after(now), 2) if self.state == "open" else 0.0,
+        }
+
+
+class RetryBudget:
+    """Token bucket shared by all retries: each request earns ``ratio`` of a retry, plus a small time-based floor."""
+
+    def __init__(self, ratio: float, min_per_second: float, burst: float = 20.0) -> None:
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.retries = 0
+        self.exhausted = 0
+        retry_budget_tokens.labels().set_function(self.available)
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.min_per_second)
+        self.updated = now
+
+    def available(self) -> float:
+        self._refill(time.monotonic())
+        return self.tokens
+
+    def deposit(self) -> None:
+        self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def withdraw(self, now: float | None = None) -> bool:
+        self._refill(time.monotonic() if now is None else now)
+        if self.tokens < 1.0:
+            self.exhausted += 1
+            retry_budget_exhausted.inc()
+            return False
+        self.tokens -= 1.0
+        self.retries += 1
+        provider_retries.inc()
+        return True
+
+    def stats(self) -> dict[str, Any]:
+        return {"tokens": round(self.available(), 2), "retries": self.retries, "exhausted": self.exhausted}
+
+
+class ProviderGuard:
+    def __init__(self, enabled: bool, max_attempts: int, base_delay: float, max_delay: float, budget: RetryBudget, breaker_options: dict[str, Any]) -> None:
+        self.enabled = enabled
+        self.max_attempts = max(max_attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.breaker_options = breaker_options
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def breaker(self, provider: str, model: str) -> CircuitBreaker:
+        key = f"{provider}:{model}"
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(key, **self.breaker_options)
+            self._breakers[key] = breaker
+        return breaker
+
+    def check(self, provider: str, model: str) -> None:
+        if self.enabled:
+            self.breaker(provider, model).check()
+
+    def backoff(self, attempt: int) -> float:
+        # Full jitter: spread retries so a brownout does not turn into synchronized waves.
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    async def _should_retry(self, attempt: int) -> bool:
+        if attempt >= self.max_attempts or not self.budget.withdraw():
+            return False
+        await asyncio.sleep(self.backoff(attempt))
+        return True
+
+    async def call(self, provider: str, model: str, fn: Callable[[], Awaitable[T]]) -> T:
+        if not self.enabled:
+            return await fn()
+        breaker = self.breaker(provider, model)
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            attempt += 1
+            breaker.allow()
+            try:
+                result = await fn()
+            except Exception as exc:
+                if not is_retryable(exc):
+                    breaker.release()
+                    raise
+                breaker.record_failure()
+                if not await self._should_retry(attempt):
+                    raise
+                continue
+            except BaseException:
+                breaker.release()
+                raise
+            breaker.record_success()
+            return result
+
+    async def stream(self, provider: str, model: str, factory: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """Like ``call`` for streams: retries only happen before the first item reaches the caller."""
+        if not self.enabled:
+            async with aclosing(factory()) as items:
+                async for item in items:
+                    yield item
+            return
+        breaker = self.breaker(provider, model)
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            attempt += 1
+            breaker.allow()
+            started = False
+            try:
+                async with aclosing(factory()) as items:
+                    async for item in items:
+                        if not started:
+                            started = True
+                            breaker.record_success()
+                        yield item
+            except Exception as exc:
+                if started:
+                    raise
+                if not is_retryable(exc):
+                    breaker.release()
+                    raise
+                breaker.record_failure()
+                if not await self._should_retry(attempt):
+                    raise
+                continue
+            except BaseException:
+                if not started:
+                    breaker.release()
+                raise
+            if not started:
+                breaker.record_success()
+            return
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "breakers": {key: breaker.stats() for key, breaker in self._breakers.items()},
+            "retry_budget": self.budget.stats(),
+        }
+
+
+def _build_guard() -> ProviderGuard:
+    settings = get_settings()
+    return ProviderGuard(
+        enabled=settings.llm_breaker_enabled,
+        max_attempts=settings.llm_retry_max_attempts,
+        base_delay=settings.llm_retry_base_delay,
+        max_delay=settings.llm_retry_max_delay,
+        budget=RetryBudget(settings.llm_retry_budget_ratio, settings.llm_retry_budget_min_per_second),
+        breaker_options={
+            "window": settings.llm_breaker_window,
+            "min_calls": settings.llm_breaker_min_calls,
+            "failure_ratio": settings.llm_breaker_failure_ratio,
+            "open_seconds": settings.llm_breaker_open_seconds,
+            "half_open_probes": settings.llm_breaker_half_open_probes,
+        },
+    )
+
+
+provider_guard = _build_guard()
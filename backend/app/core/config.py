@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Literal
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -10,15 +11,104 @@ class Settings(BaseSettings):
     secret_key: str = "change-me"
     access_token_expire_minutes: int = 30
     refresh_token_expire_minutes: int = 10080
+    auth_cache_enabled: bool = True
+    auth_cache_ttl_seconds: float = 30.0
+    auth_cache_max_entries: int = 10000
+    auth_token_claims: bool = False
+    password_hash_workers: int = 2
+    password_hash_max_queue: int = 64
+    password_hash_queue_timeout_seconds: float = 5.0
     algorithm: str = "HS256"
     database_url: str = "sqlite+aiosqlite:///./nova_bot.db"
+    database_read_url: str = ""
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout_seconds: float = 30.0
+    db_pool_recycle_seconds: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_cache_size: int = 100
+    sqlite_wal_enabled: bool = True
+    sqlite_synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_bytes: int = 256 * 1024 * 1024
+    sqlite_cache_kib: int = 64 * 1024
+    sqlite_read_connections: int = 8
     openai_api_key: str = ""
     gemini_api_key: str = ""
+    openai_base_url: str = ""
+    gemini_base_url: str = "https://generativelanguage.googleapis.com/v1beta"
     openai_model: str = "gpt-4o-mini"
     default_temperature: float = 0.7
     default_max_tokens: int = 700
     cors_origins: str = "http://localhost:5173,http://localhost:3000"
     rate_limit_per_minute: int = 60
+    rate_limit_tokens_per_minute: int = 40000
+    rate_limit_backend: str = "memory"
+    rate_limit_sqlite_path: str = "./nova_ratelimit.db"
+    rate_limit_redis_url: str = "redis://localhost:6379/0"
+    rate_limit_max_batch: int = 256
+    provider_max_connections: int = 100
+    provider_max_keepalive_connections: int = 20
+    provider_keepalive_expiry: float = 30.0
+    provider_timeout: float = 90.0
+    provider_connect_timeout: float = 10.0
+    provider_pool_timeout: float = 10.0
+    provider_http2: bool = False
+    provider_warmup: bool = True
+    llm_cache_enabled: bool = False
+    llm_cache_max_entries: int = 2048
+    llm_cache_ttl_seconds: float = 3600.0
+    llm_cache_max_temperature: float = 0.0
+    llm_coalesce_enabled: bool = True
+    llm_coalesce_max_temperature: float = 0.0
+    llm_max_concurrency: int = 64
+    llm_model_concurrency: dict[str, int] = {}
+    llm_max_queue: int = 256
+    llm_queue_timeout_seconds: float = 15.0
+    voice_client_key: str = ""
+    llm_hedge_enabled: bool = False
+    llm_hedge_quantile: float = 0.95
+    llm_hedge_min_samples: int = 20
+    llm_hedge_default_delay: float = 3.0
+    llm_hedge_min_delay: float = 0.25
+    llm_hedge_max_delay: float = 10.0
+    llm_fallback_models: dict[str, str] = {}
+    persistence_max_queue: int = 1024
+    persistence_max_batch: int = 64
+    usage_flush_rows: int = 500
+    usage_flush_interval_seconds: float = 1.0
+    usage_max_buffered_rows: int = 10000
+    usage_copy_enabled: bool = True
+    stream_coalesce_ms: float = 15.0
+    stream_coalesce_max_chars: int = 256
+    export_batch_size: int = 1000
+    llm_breaker_enabled: bool = True
+    llm_breaker_window: int = 20
+    llm_breaker_min_calls: int = 10
+    llm_breaker_failure_ratio: float = 0.5
+    llm_breaker_open_seconds: float = 15.0
+    llm_breaker_half_open_probes: int = 1
+    llm_retry_max_attempts: int = 3
+    llm_retry_base_delay: float = 0.25
+    llm_retry_max_delay: float = 4.0
+    llm_retry_budget_ratio: float = 0.1
+    llm_retry_budget_min_per_second: float = 1.0
+    context_token_budget: int = 6000
+    context_model_budgets: dict[str, int] = {}
+    context_max_messages: int = 200
+    context_summary_enabled: bool = True
+    context_summary_max_tokens: int = 400
+    context_summary_trigger_ratio: float = 0.75
+    context_summary_keep_ratio: float = 0.4
+    conversation_cache_enabled: bool = True
+    conversation_cache_max_bytes: int = 64 * 1024 * 1024
+    conversation_cache_ttl_seconds: float = 300.0
+    metrics_enabled: bool = True
+    log_level: str = "INFO"
+    log_format: Literal["text", "json"] = "text"
+    log_queue_size: int = 10000
+    request_log_sample_rate: float = 1.0
+    request_log_slow_ms: float = 1000.0
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", case_sensitive=False)
 
     @field_validator("cors_origins")
@@ -0,0 +1,87 @@
+import logging
+from typing import Any
+
+import httpx
+
+from app.core.config import get_settings
+
+logger = logging.getLogger("nova-bot.http")
+
+OPENAI_BASE_URL = "https://api.openai.com/v1"
+
+
+class ProviderPool:
+    def __init__(self) -> None:
+        self._client: httpx.AsyncClient | None = None
+        self.http2 = False
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    def _build_client(self) -> httpx.AsyncClient:
+        settings = get_settings()
+        limits = httpx.Limits(
+            max_connections=settings.provider_max_connections,
+            max_keepalive_connections=settings.provider_max_keepalive_connections,
+            keepalive_expiry=settings.provider_keepalive_expiry,
+        )
+        timeout = httpx.Timeout(settings.provider_timeout, connect=settings.provider_connect_timeout, pool=settings.provider_pool_timeout)
+        self.http2 = settings.provider_http2
+        if self.http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("PROVIDER_HTTP2 is enabled but the 'h2' package is not installed; falling back to HTTP/1.1")
+                self.http2 = False
+        return httpx.AsyncClient(limits=limits, timeout=timeout, http2=self.http2)
+
+    async def open(self, warm: bool = True) -> None:
+        client = self.client
+        if not warm:
+            return
+        settings = get_settings()
+        urls = []
+        if settings.openai_api_key:
+            urls.append(f"{(settings.openai_base_url or OPENAI_BASE_URL).rstrip('/')}/models")
+        if settings.gemini_api_key:
+            urls.append(f"{settings.gemini_base_url.rstrip('/')}/models")
+        for url in urls:
+            # Any response (even 401) leaves a TLS connection parked in the pool.
+            try:
+                await client.head(url)
+            except httpx.HTTPError as exc:
+                logger.warning("Provider warmup failed for %s: %s", url, exc)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict[str, Any]:
+        settings = get_settings()
+        data: dict[str, Any] = {
+            "open": self._client is not None and not self._client.is_closed,
+            "http2": self.http2,
+            "max_connections": settings.provider_max_connections,
+            "max_keepalive_connections": settings.provider_max_keepalive_connections,
+            "connections": 0,
+            "active": 0,
+            "idle": 0,
+            "pending_requests": 0,
+        }
+        if not data["open"]:
+            return data
+        pool = getattr(self._client._transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        idle = sum(1 for conn in connections if conn.is_idle())
+        data["connections"] = len(connections)
+        data["idle"] = idle
+        data["active"] = len(connections) - idle
+        data["pending_requests"] = sum(1 for request in getattr(pool, "_requests", []) if request.is_queued())
+        return data
+
+
+provider_pool = ProviderPool()
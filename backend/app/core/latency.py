@@ -0,0 +1,74 @@
+import bisect
+from typing import Any
+
+
+def _log_buckets(start: float, end: float, factor: float) -> list[float]:
+    bounds = []
+    value = start
+    while value < end:
+        bounds.append(round(value, 6))
+        value *= factor
+    bounds.append(end)
+    return bounds
+
+
+LATENCY_BUCKETS = _log_buckets(0.005, 120.0, 1.25)
+
+
+class LatencyHistogram:
+    """Fixed log-spaced histogram; counts are halved past ``decay_at`` so quantiles track recent traffic."""
+
+    def __init__(self, bounds: list[float] = LATENCY_BUCKETS, decay_at: int = 5000) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.decay_at = decay_at
+
+    def record(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.total += 1
+        if self.total >= self.decay_at:
+            self.counts = [count // 2 for count in self.counts]
+            self.total = sum(self.counts)
+
+    def quantile(self, q: float) -> float | None:
+        if not self.total:
+            return None
+        rank = q * self.total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.bounds[min(index, len(self.bounds) - 1)]
+        return self.bounds[-1]
+
+
+class LatencyTracker:
+    def __init__(self) -> None:
+        self._histograms: dict[tuple[str, str], LatencyHistogram] = {}
+
+    def histogram(self, kind: str, model: str) -> LatencyHistogram:
+        key = (kind, model)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = LatencyHistogram()
+            self._histograms[key] = histogram
+        return histogram
+
+    def record(self, kind: str, model: str, seconds: float) -> None:
+        self.histogram(kind, model).record(seconds)
+
+    def quantile(self, kind: str, model: str, q: float, min_samples: int = 0) -> float | None:
+        histogram = self._histograms.get((kind, model))
+        if histogram is None or histogram.total < min_samples:
+            return None
+        return histogram.quantile(q)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            f"{kind}:{model}": {"samples": h.total, "p50": h.quantile(0.5), "p95": h.quantile(0.95), "p99": h.quantile(0.99)}
+            for (kind, model), h in self._histograms.items()
+        }
+
+
+latency_tracker = LatencyTracker()
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from app.core.config import get_settings
+
+
+@dataclass(slots=True)
+class CachedCompletion:
+    model: str
+    parts: tuple[str, ...]
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    expires_at: float
+
+    @property
+    def content(self) -> str:
+        return "".join(self.parts)
+
+    def as_result(self) -> dict[str, Any]:
+        return {
+            "content": self.content.strip(),
+            "model": self.model,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "cached": True,
+        }
+
+
+class CompletionCache:
+    def __init__(self, max_entries: int, ttl_seconds: float, max_temperature: float = 0.0) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_temperature = max_temperature
+        self._entries: OrderedDict[str, CachedCompletion] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(model: str, messages: list[dict[str, str]], temperature: float, max_tokens: int) -> str:
+        normalized = [[m.get("role", "user").strip().lower(), " ".join(m.get("content", "").split())] for m in messages]
+        raw = json.dumps([model, normalized, round(float(temperature), 4), int(max_tokens)], separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def is_cacheable(self, temperature: float, opt_in: bool = False) -> bool:
+        if self.max_entries <= 0:
+            return False
+        return opt_in or temperature <= self.max_temperature
+
+    def get(self, key: str) -> CachedCompletion | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            self.evictions += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def set(self, key: str, model: str, parts: list[str] | tuple[str, ...], prompt_tokens: int, completion_tokens: int, total_tokens: int) -> None:
+        self._entries[key] = CachedCompletion(
+            model=model,
+            parts=tuple(parts),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=total_tokens,
+            expires_at=time.monotonic() + self.ttl_seconds,
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def _build_cache() -> CompletionCache:
+    settings = get_settings()
+    max_entries = settings.llm_cache_max_entries if settings.llm_cache_enabled else 0
+    return CompletionCache(max_entries=max_entries, ttl_seconds=settings.llm_cache_ttl_seconds, max_temperature=settings.llm_cache_max_temperature)
+
+
+completion_cache = _build_cache()
@@ -1,10 +1,23 @@
+import asyncio
+import json
+import dataclasses
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import aclosing
+from dataclasses import dataclass
 from decimal import Decimal
 from typing import Any
 
-import httpx
 from openai import AsyncOpenAI
 
+from app.core.admission import admission_controller
+from app.core.circuit_breaker import provider_guard
 from app.core.config import get_settings
+from app.core.http_pool import provider_pool
+from app.core.latency import latency_tracker
+from app.core.llm_cache import completion_cache
+from app.core.metrics import provider_duration, provider_errors
+from app.core.singleflight import completion_flights, stream_flights
 
 MODEL_COST_PER_1K = {
     "gpt-4o-mini": Decimal("0.0003"),
@@ -13,6 +26,58 @@ MODEL_COST_PER_1K = {
 }
 
 
+@dataclass(slots=True)
+class StreamUsage:
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+    model: str = ""
+
+
+@dataclass(slots=True)
+class StreamChunk:
+    content: str = ""
+    usage: StreamUsage | None = None
+    cached: bool = False
+
+
+def _metric_models() -> frozenset[str]:
+    settings = get_settings()
+    return frozenset({*MODEL_COST_PER_1K, settings.openai_model, *settings.llm_fallback_models, *settings.llm_fallback_models.values(), *settings.llm_model_concurrency})
+
+
+METRIC_MODELS = _metric_models()
+
+
+def model_label(model: str) -> str:
+    """Key for a client-chosen model: known models by name, anything else as "other".
+
+    Metric series, admission gates, circuit breakers and latency histograms are all keyed by it, so
+    made-up model names can't grow them without bound.
+    """
+    return model if model in METRIC_MODELS else "other"
+
+
+def provider_for(model: str) -> str:
+    return "gemini" if model.startswith("gemini") else "openai"
+
+
+def _gemini_text(data: dict[str, Any]) -> str:
+    candidates = data.get("candidates") or []
+    parts = []
+    if candidates:
+        parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join(part.get("text", "") for part in parts if isinstance(part, dict))
+
+
+def _gemini_usage(data: dict[str, Any]) -> StreamUsage:
+    usage = data.get("usageMetadata") or {}
+    prompt_tokens = int(usage.get("promptTokenCount", 0) or 0)
+    completion_tokens = int(usage.get("candidatesTokenCount", 0) or 0)
+    total_tokens = int(usage.get("totalTokenCount", prompt_tokens + completion_tokens) or 0)
+    return StreamUsage(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, total_tokens=total_tokens)
+
+
 class LLMClient:
     def __init__(self) -> None:
         settings = get_settings()
@@ -20,13 +85,125 @@ class LLMClient:
         self.default_temperature = settings.default_temperature
         self.default_max_tokens = settings.default_max_tokens
         self.gemini_api_key = settings.gemini_api_key
-        self.client = AsyncOpenAI(api_key=settings.openai_api_key)
+        self.openai_api_key = settings.openai_api_key
+        self.openai_base_url = settings.openai_base_url or None
+        self.gemini_base_url = settings.gemini_base_url.rstrip("/")
+        self._client: AsyncOpenAI | None = None
+        self.cache = completion_cache
+        self.coalesce = settings.llm_coalesce_enabled
+        self.coalesce_max_temperature = settings.llm_coalesce_max_temperature
+        self.admission = admission_controller
+        self.guard = provider_guard
+        self.latency = latency_tracker
+        self.hedge_enabled = settings.llm_hedge_enabled
+        self.hedge_quantile = settings.llm_hedge_quantile
+        self.hedge_min_samples = settings.llm_hedge_min_samples
+        self.hedge_default_delay = settings.llm_hedge_default_delay
+        self.hedge_min_delay = settings.llm_hedge_min_delay
+        self.hedge_max_delay = settings.llm_hedge_max_delay
+        self.fallback_models = settings.llm_fallback_models
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        http_client = provider_pool.client
+        if self._client is None or self._client._client is not http_client:
+            self._client = AsyncOpenAI(api_key=self.openai_api_key, base_url=self.openai_base_url, http_client=http_client, max_retries=0)
+        return self._client
+
+    def admission_check(self, model: str | None = None, priority: str = "interactive") -> None:
+        used_model = model or self.default_model
+        self.guard.check(provider_for(used_model), model_label(used_model))
+        self.admission.check(provider_for(used_model), model_label(used_model), priority)
+
+    def hedge_delay(self, kind: str, model: str) -> float:
+        observed = self.latency.quantile(kind, model_label(model), self.hedge_quantile, min_samples=self.hedge_min_samples)
+        if observed is None:
+            return self.hedge_default_delay
+        return min(max(observed, self.hedge_min_delay), self.hedge_max_delay)
+
+    def hedge_model(self, model: str) -> str:
+        return self.fallback_models.get(model, model)
 
-    async def complete(self, messages: list[dict[str, str]], model: str | None = None, temperature: float | None = None, max_tokens: int | None = None) -> dict[str, Any]:
+    async def complete(self, messages: list[dict[str, str]], model: str | None = None, temperature: float | None = None, max_tokens: int | None = None, cache: bool = False, priority: str = "interactive", hedge: bool | None = None) -> dict[str, Any]:
         used_model = model or self.default_model
         used_temperature = temperature if temperature is not None else self.default_temperature
         used_max_tokens = max_tokens if max_tokens is not None else self.default_max_tokens
 
+        cache_key = self.cache.make_key(used_model, messages, used_temperature, used_max_tokens)
+        cacheable = self.cache.is_cacheable(used_temperature, opt_in=cache)
+        if cacheable:
+            entry = self.cache.get(cache_key)
+            if entry is not None:
+                return entry.as_result()
+
+        hedged = self.hedge_enabled if hedge is None else hedge
+
+        async def call() -> dict[str, Any]:
+            def attempt(attempt_model: str) -> Awaitable[dict[str, Any]]:
+                return self._complete_attempt(messages, attempt_model, used_temperature, used_max_tokens, priority)
+
+            if hedged:
+                result = await self._complete_hedged(attempt, used_model)
+            else:
+                result = await attempt(used_model)
+            if cacheable:
+                self.cache.set(cache_key, result["model"], [result["content"]], result["prompt_tokens"], result["completion_tokens"], result["total_tokens"])
+            return result
+
+        if self.coalesces(used_temperature):
+            shared_result, shared = await completion_flights.do(cache_key, call)
+            result = dict(shared_result)
+        else:
+            result, shared = await call(), False
+        # Only the caller that started the provider call pays for it; joiners are logged like cache hits.
+        result["cached"] = shared
+        return result
+
+    def coalesces(self, temperature: float) -> bool:
+        # Above the threshold, identical prompts are expected to get independent samples.
+        return self.coalesce and temperature <= self.coalesce_max_temperature
+
+    async def _complete_attempt(self, messages: list[dict[str, str]], model: str, temperature: float, max_tokens: int, priority: str) -> dict[str, Any]:
+        return await self.guard.call(provider_for(model), model_label(model), lambda: self._complete_once(messages, model, temperature, max_tokens, priority))
+
+    async def _complete_once(self, messages: list[dict[str, str]], model: str, temperature: float, max_tokens: int, priority: str) -> dict[str, Any]:
+        provider = provider_for(model)
+        label = model_label(model)
+        async with self.admission.slot(provider, label, priority):
+            started = time.monotonic()
+            try:
+                result = await self._complete_uncached(messages, model, temperature, max_tokens)
+            except asyncio.CancelledError:
+                # Usually a hedged attempt that lost the race. It would have taken at least this long, and leaving
+                # it out would drop exactly the slow tail that the hedge delay is computed from.
+                self.latency.record("complete", label, time.monotonic() - started)
+                raise
+            except Exception:
+                provider_errors.inc(provider, label, "complete")
+                raise
+            elapsed = time.monotonic() - started
+            self.latency.record("complete", label, elapsed)
+            provider_duration.observe(provider, label, "complete", value=elapsed)
+            return result
+
+    async def _complete_hedged(self, attempt: Callable[[str], Awaitable[dict[str, Any]]], model: str) -> dict[str, Any]:
+        primary = asyncio.ensure_future(attempt(model))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay("complete", model))
+            if not done:
+                tasks.add(asyncio.ensure_future(attempt(self.hedge_model(model))))
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+            return primary.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _complete_uncached(self, messages: list[dict[str, str]], used_model: str, used_temperature: float, used_max_tokens: int) -> dict[str, Any]:
         if used_model.startswith("gemini"):
             return await self._complete_gemini(
                 messages=messages,
@@ -51,7 +228,7 @@ class LLMClient:
             "total_tokens": int(usage.total_tokens if usage else 0),
         }
 
-    async def _complete_gemini(self, messages: list[dict[str, str]], model: str, temperature: float, max_tokens: int) -> dict[str, Any]:
+    def _gemini_request(self, messages: list[dict[str, str]], model: str, temperature: float, max_tokens: int) -> tuple[str, dict[str, Any], dict[str, str]]:
         if not self.gemini_api_key:
             raise RuntimeError("GEMINI_API_KEY is missing in backend/.env")
 
@@ -86,71 +263,193 @@ class LLMClient:
         if model in {"gemini-1.5-flash", "gemini-1.5-flash-latest"}:
             # Legacy selection fallback.
             provider_model = "gemini-2.5-flash"
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{provider_model}:generateContent"
         headers = {"x-goog-api-key": self.gemini_api_key}
-        async with httpx.AsyncClient(timeout=90.0) as client:
-            response = await client.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-
-        candidates = data.get("candidates") or []
-        parts = []
-        if candidates:
-            parts = candidates[0].get("content", {}).get("parts", [])
-        content = "".join(part.get("text", "") for part in parts if isinstance(part, dict)).strip()
-
-        usage = data.get("usageMetadata", {})
-        prompt_tokens = int(usage.get("promptTokenCount", 0) or 0)
-        completion_tokens = int(usage.get("candidatesTokenCount", 0) or 0)
-        total_tokens = int(usage.get("totalTokenCount", prompt_tokens + completion_tokens) or 0)
+        return provider_model, payload, headers
 
+    async def _complete_gemini(self, messages: list[dict[str, str]], model: str, temperature: float, max_tokens: int) -> dict[str, Any]:
+        provider_model, payload, headers = self._gemini_request(messages, model, temperature, max_tokens)
+        url = f"{self.gemini_base_url}/models/{provider_model}:generateContent"
+        response = await provider_pool.client.post(url, json=payload, headers=headers)
+        response.raise_for_status()
+        data = response.json()
+
+        usage = _gemini_usage(data)
         return {
-            "content": content,
+            "content": _gemini_text(data).strip(),
             "model": model,
-            "prompt_tokens": prompt_tokens,
-            "completion_tokens": completion_tokens,
-            "total_tokens": total_tokens,
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "total_tokens": usage.total_tokens,
         }
 
-    async def stream(self, messages: list[dict[str, str]], model: str | None = None, temperature: float | None = None, max_tokens: int | None = None):
+    async def _stream_gemini(self, messages: list[dict[str, str]], model: str, temperature: float, max_tokens: int) -> AsyncIterator[StreamChunk]:
+        provider_model, payload, headers = self._gemini_request(messages, model, temperature, max_tokens)
+        url = f"{self.gemini_base_url}/models/{provider_model}:streamGenerateContent"
+        usage: StreamUsage | None = None
+        async with provider_pool.client.stream("POST", url, params={"alt": "sse"}, json=payload, headers=headers) as response:
+            if response.is_error:
+                await response.aread()
+                response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                raw = line[5:].strip()
+                if not raw:
+                    continue
+                data = json.loads(raw)
+                text = _gemini_text(data)
+                if text:
+                    yield StreamChunk(content=text)
+                # usageMetadata is cumulative; the final frame carries the totals.
+                if data.get("usageMetadata"):
+                    usage = _gemini_usage(data)
+        yield StreamChunk(usage=usage or StreamUsage())
+
+    async def stream(self, messages: list[dict[str, str]], model: str | None = None, temperature: float | None = None, max_tokens: int | None = None, cache: bool = False, priority: str = "interactive", hedge: bool | None = None) -> AsyncIterator[StreamChunk]:
         used_model = model or self.default_model
+        used_temperature = temperature if temperature is not None else self.default_temperature
+        used_max_tokens = max_tokens if max_tokens is not None else self.default_max_tokens
+
+        cache_key = self.cache.make_key(used_model, messages, used_temperature, used_max_tokens)
+        cacheable = self.cache.is_cacheable(used_temperature, opt_in=cache)
+        if cacheable:
+            entry = self.cache.get(cache_key)
+            if entry is not None:
+                for part in entry.parts:
+                    yield StreamChunk(content=part, cached=True)
+                yield StreamChunk(usage=StreamUsage(entry.prompt_tokens, entry.completion_tokens, entry.total_tokens, entry.model), cached=True)
+                return
+
+        def source() -> AsyncIterator[StreamChunk]:
+            return self._stream_recorded(messages, used_model, used_temperature, used_max_tokens, cache_key if cacheable else None, priority, self.hedge_enabled if hedge is None else hedge)
+
+        # Every layer closes the one below explicitly, so a caller that stops early frees the admission slot and
+        # the pooled connection right away instead of whenever the abandoned generators are collected.
+        if self.coalesces(used_temperature):
+            async with aclosing(stream_flights.subscribe(cache_key, source)) as flight:
+                async for chunk, shared in flight:
+                    yield dataclasses.replace(chunk, cached=True) if shared else chunk
+        else:
+            async with aclosing(source()) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+
+    async def _stream_recorded(self, messages: list[dict[str, str]], used_model: str, used_temperature: float, used_max_tokens: int, cache_key: str | None, priority: str, hedged: bool) -> AsyncIterator[StreamChunk]:
+        def attempt(attempt_model: str) -> AsyncIterator[StreamChunk]:
+            return self._stream_attempt(messages, attempt_model, used_temperature, used_max_tokens, priority)
+
+        parts: list[str] = []
+        usage: StreamUsage | None = None
+        source = self._stream_hedged(attempt, used_model) if hedged else attempt(used_model)
+        async with aclosing(source) as chunks:
+            async for chunk in chunks:
+                if chunk.content:
+                    parts.append(chunk.content)
+                if chunk.usage:
+                    usage = chunk.usage
+                yield chunk
+        if cache_key is not None and parts and usage is not None:
+            self.cache.set(cache_key, usage.model or used_model, parts, usage.prompt_tokens, usage.completion_tokens, usage.total_tokens)
+
+    def _stream_attempt(self, messages: list[dict[str, str]], model: str, temperature: float, max_tokens: int, priority: str) -> AsyncIterator[StreamChunk]:
+        return self.guard.stream(provider_for(model), model_label(model), lambda: self._stream_once(messages, model, temperature, max_tokens, priority))
+
+    async def _stream_once(self, messages: list[dict[str, str]], model: str, temperature: float, max_tokens: int, priority: str) -> AsyncIterator[StreamChunk]:
+        provider = provider_for(model)
+        label = model_label(model)
+        async with self.admission.slot(provider, label, priority):
+            started = time.monotonic()
+            first = True
+            try:
+                async with aclosing(self._stream_uncached(messages, model, temperature, max_tokens)) as chunks:
+                    async for chunk in chunks:
+                        if first:
+                            self.latency.record("ttft", label, time.monotonic() - started)
+                            first = False
+                        if chunk.usage:
+                            chunk.usage.model = model
+                        yield chunk
+            except (asyncio.CancelledError, GeneratorExit):
+                if first:
+                    # A losing hedge attempt: its first token was at least this far away (see _complete_once).
+                    self.latency.record("ttft", label, time.monotonic() - started)
+                raise
+            except Exception:
+                provider_errors.inc(provider, label, "stream")
+                raise
+            provider_duration.observe(provider, label, "stream", value=time.monotonic() - started)
+
+    async def _stream_hedged(self, attempt: Callable[[str], AsyncIterator[StreamChunk]], model: str) -> AsyncIterator[StreamChunk]:
+        # Race attempts on their first chunk only; once one has produced output it is the stream.
+        primary = attempt(model)
+        heads = {asyncio.ensure_future(anext(primary)): primary}
+        winner = None
+        first_chunk: StreamChunk | None = None
+        failure: BaseException | None = None
+        try:
+            done, _ = await asyncio.wait(heads, timeout=self.hedge_delay("ttft", model))
+            if not done:
+                backup = attempt(self.hedge_model(model))
+                heads[asyncio.ensure_future(anext(backup))] = backup
+            pending = set(heads)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    exc = task.exception()
+                    if exc is None or isinstance(exc, StopAsyncIteration):
+                        winner = heads[task]
+                        first_chunk = None if exc else task.result()
+                        break
+                    if failure is None or heads[task] is primary:
+                        failure = exc
+        finally:
+            for task, source in heads.items():
+                if source is not winner:
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    await source.aclose()
+
+        if winner is None:
+            raise failure or RuntimeError("All hedged attempts failed")
+        try:
+            if first_chunk is None:
+                return
+            yield first_chunk
+            async for chunk in winner:
+                yield chunk
+        finally:
+            await winner.aclose()
+
+    async def _stream_uncached(self, messages: list[dict[str, str]], used_model: str, used_temperature: float, used_max_tokens: int) -> AsyncIterator[StreamChunk]:
         if used_model.startswith("gemini"):
-            result = await self.complete(messages, model=used_model, temperature=temperature, max_tokens=max_tokens)
-            for token in result["content"].split(" "):
-                if token:
-                    class Delta:
-                        content = token + " "
-
-                    class Choice:
-                        delta = Delta()
-
-                    class Chunk:
-                        choices = [Choice()]
-                        usage = None
-
-                    yield Chunk()
-            class Usage:
-                prompt_tokens = result["prompt_tokens"]
-                completion_tokens = result["completion_tokens"]
-                total_tokens = result["total_tokens"]
-
-            class FinalChunk:
-                choices = []
-                usage = Usage()
-
-            yield FinalChunk()
+            async with aclosing(self._stream_gemini(messages, used_model, used_temperature, used_max_tokens)) as chunks:
+                async for chunk in chunks:
+                    yield chunk
             return
 
         stream = await self.client.chat.completions.create(
             model=used_model,
             messages=messages,
-            temperature=temperature if temperature is not None else self.default_temperature,
-            max_tokens=max_tokens if max_tokens is not None else self.default_max_tokens,
+            temperature=used_temperature,
+            max_tokens=used_max_tokens,
             stream=True,
             stream_options={"include_usage": True},
         )
-        async for chunk in stream:
-            yield chunk
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                    yield StreamChunk(content=chunk.choices[0].delta.content)
+                if chunk.usage:
+                    yield StreamChunk(
+                        usage=StreamUsage(
+                            prompt_tokens=int(chunk.usage.prompt_tokens or 0),
+                            completion_tokens=int(chunk.usage.completion_tokens or 0),
+                            total_tokens=int(chunk.usage.total_tokens or 0),
+                        )
+                    )
+        finally:
+            # Returns the HTTP connection to the pool even when the consumer stops early.
+            await stream.close()
 
     @staticmethod
     def estimate_cost(model: str, total_tokens: int) -> Decimal:
@@ -0,0 +1,260 @@
+import abc
+import bisect
+import math
+import time
+from collections.abc import Callable, Iterable
+from typing import Any
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+TOKEN_GAP_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0)
+RATE_BUCKETS = (1.0, 5.0, 10.0, 25.0, 50.0, 100.0, 200.0, 400.0, 800.0, 1600.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value", "function")
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self.function: Callable[[], float] | None = None
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        # Read at scrape time, for state another object already keeps (queue depth, breaker state).
+        self.function = function
+
+    def get(self) -> float:
+        return self.function() if self.function is not None else self.value
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self.bounds = bounds
+        # One slot per bucket plus +Inf; kept non-cumulative so an observation touches a single slot.
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class _Family(abc.ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], Any] = {}
+
+    @abc.abstractmethod
+    def _new_child(self) -> Any: ...
+
+    def labels(self, *values: str) -> Any:
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _header(self, name: str) -> list[str]:
+        return [f"# HELP {name} {self.documentation}", f"# TYPE {name} {self.kind}"]
+
+    @abc.abstractmethod
+    def render(self) -> list[str]: ...
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, *values: str, amount: float = 1.0) -> None:
+        self.labels(*values).inc(amount)
+
+    def render(self) -> list[str]:
+        # The text format wants HELP and TYPE under the sample name, which for counters carries _total.
+        name = f"{self.name}_total"
+        lines = self._header(name)
+        for values, child in list(self._children.items()):
+            lines.append(f"{name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}")
+        return lines
+
+
+class Gauge(_Family):
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, *values: str, value: float) -> None:
+        self.labels(*values).set(value)
+
+    def render(self) -> list[str]:
+        lines = self._header(self.name)
+        for values, child in list(self._children.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.get())}")
+        return lines
+
+
+class Histogram(_Family):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: tuple[float, ...] = HTTP_BUCKETS) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, *values: str, value: float) -> None:
+        self.labels(*values).observe(value)
+
+    def render(self) -> list[str]:
+        lines = self._header(self.name)
+        for values, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip((*child.bounds, math.inf), list(child.counts)):
+                cumulative += count
+                le = 'le="' + _format_value(float(bound)) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Per-process counters, gauges and histograms in the Prometheus text format.
+
+    Everything is updated from the event loop thread, so observations are plain attribute and list
+    updates with no locking. Each worker process exposes its own series; Prometheus sums them.
+    """
+
+    def __init__(self) -> None:
+        self._families: dict[str, _Family] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: tuple[float, ...] = HTTP_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, family: Any) -> Any:
+        if family.name in self._families:
+            raise ValueError(f"Metric {family.name} is already registered")
+        self._families[family.name] = family
+        return family
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for family in self._families.values():
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "nova_http_request_duration_seconds", "Time from request start to the last body byte, by route template.", ("method", "route", "status")
+)
+stream_ttft = registry.histogram(
+    "nova_stream_time_to_first_token_seconds", "Time from the streaming request reaching the handler to the first token frame.", ("model",)
+)
+stream_inter_token = registry.histogram(
+    "nova_stream_inter_token_seconds", "Gap between consecutive token frames of a streamed reply.", ("model",), TOKEN_GAP_BUCKETS
+)
+stream_tokens_per_second = registry.histogram(
+    "nova_stream_tokens_per_second", "Completion tokens per second after the first token, per streamed reply.", ("model",), RATE_BUCKETS
+)
+provider_duration = registry.histogram(
+    "nova_provider_request_duration_seconds", "Provider call latency: full completion, or the whole stream.", ("provider", "model", "kind")
+)
+provider_errors = registry.counter("nova_provider_errors", "Provider calls that raised, by model.", ("provider", "model", "kind"))
+db_pool_wait = registry.histogram("nova_db_pool_wait_seconds", "Time spent waiting for a pooled database connection.", ("engine",), DB_BUCKETS)
+db_pool_timeouts = registry.counter("nova_db_pool_timeouts", "Connection checkouts that gave up waiting.", ("engine",))
+db_query_duration = registry.histogram("nova_db_query_duration_seconds", "Statement execution time by verb.", ("engine", "statement"), DB_BUCKETS)
+rate_limit_rejections = registry.counter("nova_rate_limit_rejections", "Requests refused by the per-user rate limiter.", ("route",))
+admission_in_flight = registry.gauge("nova_admission_in_flight", "Calls holding an admission slot, by gate.", ("gate",))
+admission_queued = registry.gauge("nova_admission_queued", "Calls waiting for an admission slot, by gate.", ("gate",))
+admission_wait = registry.histogram("nova_admission_wait_seconds", "Time admitted calls spent waiting for a slot.", ("gate",))
+admission_shed = registry.counter("nova_admission_shed", "Calls refused by admission control: queue_full, deadline or timeout.", ("gate", "reason"))
+circuit_state = registry.gauge("nova_circuit_state", "Provider circuit breaker state: 0 closed, 1 half-open, 2 open.", ("breaker",))
+circuit_trips = registry.counter("nova_circuit_trips", "Times a provider circuit breaker opened.", ("breaker",))
+circuit_rejections = registry.counter("nova_circuit_rejections", "Calls refused without reaching the provider because its circuit was open.", ("breaker",))
+provider_retries = registry.counter("nova_provider_retries", "Provider calls retried after a retryable failure.")
+retry_budget_tokens = registry.gauge("nova_retry_budget_tokens", "Retries the shared retry budget can currently pay for.")
+retry_budget_exhausted = registry.counter("nova_retry_budget_exhausted", "Retries skipped because the retry budget was empty.")
+
+
+def statement_verb(statement: str) -> str:
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return verb if verb in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "PRAGMA", "COPY") else "OTHER"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request latency per route template, streams included."""
+
+    def __init__(self, app: Any, histogram: Histogram = http_request_duration) -> None:
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: dict[str, Any]) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route on the scope; unmatched paths share one series.
+            route = getattr(scope.get("route"), "path", "unmatched")
+            self.histogram.observe(scope["method"], route, str(status_code), value=time.perf_counter() - started)
@@ -0,0 +1,311 @@
+import abc
+import asyncio
+import logging
+import math
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+from app.core.config import get_settings
+
+logger = logging.getLogger("nova-bot.ratelimit")
+
+WINDOW_SECONDS = 60.0
+
+
+@dataclass(frozen=True, slots=True)
+class RatePolicy:
+    requests_per_minute: int
+    tokens_per_minute: int = 0
+
+    @property
+    def request_interval(self) -> float:
+        return WINDOW_SECONDS / self.requests_per_minute if self.requests_per_minute > 0 else 0.0
+
+    @property
+    def token_interval(self) -> float:
+        return WINDOW_SECONDS / self.tokens_per_minute if self.tokens_per_minute > 0 else 0.0
+
+    def step(self, request_tat: float | None, token_tat: float | None, tokens: int, now: float) -> tuple[float, float, float]:
+        """Apply one GCRA step; return (retry_after, new_request_tat, new_token_tat)."""
+        request_tat = now if request_tat is None or request_tat < now else request_tat
+        token_tat = now if token_tat is None or token_tat < now else token_tat
+
+        retry_after = 0.0
+        new_request_tat = request_tat + self.request_interval
+        if self.request_interval and new_request_tat - now > WINDOW_SECONDS:
+            retry_after = new_request_tat - now - WINDOW_SECONDS
+        new_token_tat = token_tat
+        if self.token_interval and tokens > 0:
+            new_token_tat = token_tat + self.token_interval * min(tokens, self.tokens_per_minute)
+            if new_token_tat - now > WINDOW_SECONDS:
+                retry_after = max(retry_after, new_token_tat - now - WINDOW_SECONDS)
+        return retry_after, new_request_tat, new_token_tat
+
+
+class RateLimiter:
+    """GCRA limiter on requests and requested tokens per minute; idle keys are swept shard by shard."""
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int = 0, shards: int = 64, sweep_every: int = 256) -> None:
+        self.policy = RatePolicy(requests_per_minute, tokens_per_minute)
+        self._shards: list[dict[Any, list[float]]] = [{} for _ in range(shards)]
+        self._sweep_every = sweep_every
+        self._calls = 0
+        self._next_sweep = 0
+        self.allowed = 0
+        self.rejected = 0
+
+    def _shard(self, key: Any) -> dict[Any, list[float]]:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def check(self, key: Any, tokens: int = 0, now: float | None = None) -> float:
+        """Admit one request costing ``tokens``; return 0.0 if allowed, else seconds until retry."""
+        if now is None:
+            now = time.monotonic()
+        self._calls += 1
+        if self._calls % self._sweep_every == 0:
+            self._sweep(now)
+
+        shard = self._shard(key)
+        state = shard.get(key)
+        retry_after, new_request_tat, new_token_tat = self.policy.step(state[0] if state else None, state[1] if state else None, tokens, now)
+        if retry_after > 0:
+            self.rejected += 1
+            return retry_after
+        if state:
+            state[0] = new_request_tat
+            state[1] = new_token_tat
+        else:
+            shard[key] = [new_request_tat, new_token_tat]
+        self.allowed += 1
+        return 0.0
+
+    def _sweep(self, now: float) -> None:
+        shard = self._shards[self._next_sweep]
+        self._next_sweep = (self._next_sweep + 1) % len(self._shards)
+        expired = [key for key, state in shard.items() if state[0] <= now and state[1] <= now]
+        for key in expired:
+            del shard[key]
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def stats(self) -> dict[str, int]:
+        return {"keys": len(self), "allowed": self.allowed, "rejected": self.rejected}
+
+
+class RateLimitBackend(abc.ABC):
+    name = "base"
+
+    @abc.abstractmethod
+    async def check(self, key: Any, tokens: int = 0) -> float: ...
+
+    async def close(self) -> None:
+        return None
+
+    def stats(self) -> dict[str, Any]:
+        return {"backend": self.name}
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    name = "memory"
+
+    def __init__(self, policy: RatePolicy) -> None:
+        self.limiter = RateLimiter(policy.requests_per_minute, policy.tokens_per_minute)
+
+    async def check(self, key: Any, tokens: int = 0) -> float:
+        return self.limiter.check(key, tokens)
+
+    def stats(self) -> dict[str, Any]:
+        return {"backend": self.name, **self.limiter.stats()}
+
+
+class BatchedRateLimitBackend(RateLimitBackend):
+    """Queue concurrent checks and settle them with one atomic round trip to the shared store.
+
+    Batching adds no delay: the first check starts a flush immediately, and checks that arrive
+    while that flush is in flight are settled together by the next one.
+    """
+
+    def __init__(self, policy: RatePolicy, max_batch: int = 256) -> None:
+        self.policy = policy
+        self.max_batch = max_batch
+        self._pending: list[tuple[str, int, asyncio.Future]] = []
+        self._flusher: asyncio.Task | None = None
+        self.allowed = 0
+        self.rejected = 0
+        self.errors = 0
+        self.batches = 0
+
+    async def check(self, key: Any, tokens: int = 0) -> float:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((str(key), tokens, future))
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush())
+        return await future
+
+    async def _flush(self) -> None:
+        while self._pending:
+            batch, self._pending = self._pending[: self.max_batch], self._pending[self.max_batch :]
+            try:
+                results = await self._apply([(key, tokens) for key, tokens, _ in batch], time.time())
+            except Exception as exc:
+                # Fail open: a broken shared store must not take chat down with it.
+                logger.warning("Shared rate limit store failed, allowing %s requests: %s", len(batch), exc)
+                self.errors += 1
+                results = [0.0] * len(batch)
+            self.batches += 1
+            for (_, _, future), retry_after in zip(batch, results):
+                if retry_after > 0:
+                    self.rejected += 1
+                else:
+                    self.allowed += 1
+                if not future.done():
+                    future.set_result(retry_after)
+
+    @abc.abstractmethod
+    async def _apply(self, batch: list[tuple[str, int]], now: float) -> list[float]: ...
+
+    def stats(self) -> dict[str, Any]:
+        return {"backend": self.name, "allowed": self.allowed, "rejected": self.rejected, "errors": self.errors, "batches": self.batches, "pending": len(self._pending)}
+
+
+class SQLiteRateLimitBackend(BatchedRateLimitBackend):
+    """Share limiter state between local workers through one SQLite file in WAL mode."""
+
+    name = "sqlite"
+
+    def __init__(self, policy: RatePolicy, path: str, max_batch: int = 256, sweep_every: int = 512) -> None:
+        super().__init__(policy, max_batch=min(max_batch, 900))
+        self.path = path
+        self.sweep_every = sweep_every
+        # sqlite3 connections are bound to the thread that opened them.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ratelimit-sqlite")
+        self._conn: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, request_tat REAL NOT NULL, token_tat REAL NOT NULL) WITHOUT ROWID")
+            self._conn = conn
+        return self._conn
+
+    async def _apply(self, batch: list[tuple[str, int]], now: float) -> list[float]:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._apply_sync, batch, now)
+
+    def _apply_sync(self, batch: list[tuple[str, int]], now: float) -> list[float]:
+        conn = self._connect()
+        keys = list({key for key, _ in batch})
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            placeholders = ",".join("?" * len(keys))
+            state = {row[0]: (row[1], row[2]) for row in conn.execute(f"SELECT key, request_tat, token_tat FROM rate_limits WHERE key IN ({placeholders})", keys)}
+            results = []
+            dirty = set()
+            for key, tokens in batch:
+                request_tat, token_tat = state.get(key, (None, None))
+                retry_after, new_request_tat, new_token_tat = self.policy.step(request_tat, token_tat, tokens, now)
+                if not retry_after:
+                    state[key] = (new_request_tat, new_token_tat)
+                    dirty.add(key)
+                results.append(retry_after)
+            conn.executemany(
+                "INSERT INTO rate_limits (key, request_tat, token_tat) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET request_tat = excluded.request_tat, token_tat = excluded.token_tat",
+                [(key, *state[key]) for key in dirty],
+            )
+            if self.batches % self.sweep_every == 0:
+                conn.execute("DELETE FROM rate_limits WHERE request_tat < ? AND token_tat < ?", (now, now))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return results
+
+    async def close(self) -> None:
+        def _close() -> None:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+        await asyncio.get_running_loop().run_in_executor(self._executor, _close)
+        self._executor.shutdown(wait=True)
+
+
+REDIS_GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local request_interval = tonumber(ARGV[2])
+local token_interval = tonumber(ARGV[3])
+local window = tonumber(ARGV[4])
+local token_capacity = tonumber(ARGV[5])
+local out = {}
+for i, key in ipairs(KEYS) do
+  local tokens = tonumber(ARGV[5 + i])
+  local state = redis.call('HMGET', key, 'r', 't')
+  local request_tat = math.max(tonumber(state[1]) or now, now)
+  local token_tat = math.max(tonumber(state[2]) or now, now)
+  local retry = 0
+  local new_request_tat = request_tat + request_interval
+  if request_interval > 0 and new_request_tat - now > window then retry = new_request_tat - now - window end
+  local new_token_tat = token_tat
+  if token_interval > 0 and tokens > 0 then
+    new_token_tat = token_tat + token_interval * math.min(tokens, token_capacity)
+    if new_token_tat - now > window then retry = math.max(retry, new_token_tat - now - window) end
+  end
+  if retry == 0 then
+    redis.call('HSET', key, 'r', tostring(new_request_tat), 't', tostring(new_token_tat))
+    redis.call('PEXPIRE', key, math.ceil((math.max(new_request_tat, new_token_tat) - now) * 1000) + 1000)
+  end
+  out[i] = tostring(retry)
+end
+return out
+"""
+
+
+class RedisRateLimitBackend(BatchedRateLimitBackend):
+    """Run each batch as one Lua script on any client exposing redis-py's async ``eval``."""
+
+    name = "redis"
+
+    def __init__(self, policy: RatePolicy, client: Any, prefix: str = "{nova-rl}:", max_batch: int = 256) -> None:
+        super().__init__(policy, max_batch=max_batch)
+        self.client = client
+        # The hash tag keeps every key of a batch in one cluster slot.
+        self.prefix = prefix
+
+    async def _apply(self, batch: list[tuple[str, int]], now: float) -> list[float]:
+        keys = [self.prefix + key for key, _ in batch]
+        args = [now, self.policy.request_interval, self.policy.token_interval, WINDOW_SECONDS, self.policy.tokens_per_minute]
+        args.extend(tokens for _, tokens in batch)
+        results = await self.client.eval(REDIS_GCRA_SCRIPT, len(keys), *keys, *args)
+        return [float(value) for value in results]
+
+    async def close(self) -> None:
+        close = getattr(self.client, "aclose", None) or getattr(self.client, "close", None)
+        if close is not None:
+            await close()
+
+
+def retry_after_header(seconds: float) -> dict[str, str]:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+
+def build_rate_limit_backend() -> RateLimitBackend:
+    settings = get_settings()
+    policy = RatePolicy(settings.rate_limit_per_minute, settings.rate_limit_tokens_per_minute)
+    if settings.rate_limit_backend == "sqlite":
+        return SQLiteRateLimitBackend(policy, settings.rate_limit_sqlite_path, max_batch=settings.rate_limit_max_batch)
+    if settings.rate_limit_backend == "redis":
+        try:
+            from redis.asyncio import Redis
+        except ImportError as exc:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package") from exc
+        return RedisRateLimitBackend(policy, Redis.from_url(settings.rate_limit_redis_url), max_batch=settings.rate_limit_max_batch)
+    return MemoryRateLimitBackend(policy)
+
+
+rate_limiter = build_rate_limit_backend()
@@ -0,0 +1,172 @@
+import json
+import logging
+import queue
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+
+# Attributes every LogRecord carries; anything else on a record was passed through ``extra``.
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message and any ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc_info"] = record.exc_text
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Queue handler that drops records instead of blocking or raising when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogShipper:
+    """Moves log output off the event loop.
+
+    Loggers only enqueue records; a background thread does the formatting and the writes, so a slow
+    stdout pipe or disk never stalls request handling. If the writer falls behind by ``max_queue``
+    records, new records are dropped and counted rather than applying back-pressure.
+    """
+
+    def __init__(self, handler: logging.Handler, max_queue: int = 10000) -> None:
+        self.max_queue = max_queue
+        self.output = handler
+        self.queue: queue.Queue = queue.Queue(max_queue)
+        self.handler = DroppingQueueHandler(self.queue)
+        self.listener = QueueListener(self.queue, handler, respect_handler_level=True)
+        self._running = False
+        self._installed_on: logging.Logger | None = None
+
+    def start(self) -> None:
+        if not self._running:
+            self.listener.start()
+            self._running = True
+
+    def install(self, logger: logging.Logger, level: str | None = None) -> None:
+        """Replace ``logger``'s handlers with the queue handler and start the writer thread."""
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        logger.addHandler(self.handler)
+        if level:
+            logger.setLevel(level.upper())
+        self._installed_on = logger
+        self.start()
+
+    def stop(self) -> None:
+        """Flush whatever is queued and stop the writer thread.
+
+        A logger it was installed on gets the output handler back directly, so records logged after shutdown
+        are still written rather than queued for a thread that is gone.
+        """
+        if self._running:
+            self.listener.stop()
+            self._running = False
+        if self._installed_on is not None:
+            self._installed_on.removeHandler(self.handler)
+            self._installed_on.addHandler(self.output)
+            self._installed_on = None
+
+    def stats(self) -> dict[str, Any]:
+        return {"queued": self.queue.qsize(), "max_queue": self.max_queue, "dropped": self.handler.dropped, "running": self._running}
+
+
+def build_log_shipper(fmt: str = "text", max_queue: int = 10000, stream: Any = None) -> LogShipper:
+    """A LogShipper writing to ``stream`` (stdout by default); nothing is routed through it until ``install``."""
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+    return LogShipper(output, max_queue=max_queue)
+
+
+def configure_logging(level: str = "INFO", fmt: str = "text", max_queue: int = 10000, stream: Any = None) -> LogShipper:
+    """Route the root logger through a LogShipper writing to ``stream`` (stdout by default)."""
+    shipper = build_log_shipper(fmt, max_queue, stream)
+    shipper.install(logging.getLogger(), level)
+    return shipper
+
+
+class RequestLogMiddleware:
+    """Pure ASGI access log: one structured record per request, written once the response has finished.
+
+    Successful requests are sampled at ``sample_rate``; server errors and anything slower than
+    ``slow_ms`` are always logged. Unlike ``@app.middleware("http")``, response chunks pass straight
+    through to the server with no extra task or memory stream per request.
+    """
+
+    def __init__(self, app: Any, logger: logging.Logger | None = None, sample_rate: float = 1.0, slow_ms: float = 1000.0) -> None:
+        self.app = app
+        self.logger = logger or logging.getLogger("nova-bot.access")
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+        first_byte_ms = None
+        sent = 0
+
+        async def send_wrapper(message: dict[str, Any]) -> None:
+            nonlocal status_code, first_byte_ms, sent
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                first_byte_ms = round((time.perf_counter() - started) * 1000, 2)
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = round((time.perf_counter() - started) * 1000, 2)
+            if status_code >= 500 or duration_ms >= self.slow_ms or self.sample_rate >= 1.0 or random.random() < self.sample_rate:
+                path = scope["path"]
+                client = scope.get("client")
+                self.logger.info(
+                    "%s %s -> %s (%sms)",
+                    scope["method"],
+                    path,
+                    status_code,
+                    duration_ms,
+                    extra={
+                        "method": scope["method"],
+                        "path": path,
+                        "route": getattr(scope.get("route"), "path", None),
+                        "status": status_code,
+                        "duration_ms": duration_ms,
+                        "first_byte_ms": first_byte_ms,
+                        "bytes": sent,
+                        "client": client[0] if client else None,
+                        "sample_rate": self.sample_rate,
+                    },
+                )
@@ -1,9 +1,16 @@
+import asyncio
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, TypeVar
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from app.core.admission import ModelGate
 from app.core.config import get_settings
 
+T = TypeVar("T")
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
@@ -19,6 +26,58 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+class PasswordHasher:
+    """Runs bcrypt on a small dedicated thread pool so a login burst never blocks the event loop.
+
+    bcrypt releases the GIL while hashing, so the threads run in parallel. The gate caps how many
+    hashes run and wait at once; callers beyond that get AdmissionRejected instead of queueing forever.
+    """
+
+    def __init__(self, workers: int, max_queue: int, queue_timeout: float) -> None:
+        self.workers = workers
+        self.gate = ModelGate("password-hashing", workers, max_queue, queue_timeout)
+        self._executor: ThreadPoolExecutor | None = None
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        await self.gate.acquire("interactive")
+        started = time.monotonic()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool(), func, *args)
+        finally:
+            self.gate.release(time.monotonic() - started)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict[str, Any]:
+        return {"workers": self.workers, **self.gate.stats()}
+
+
+def _build_hasher() -> PasswordHasher:
+    settings = get_settings()
+    return PasswordHasher(
+        workers=settings.password_hash_workers,
+        max_queue=settings.password_hash_max_queue,
+        queue_timeout=settings.password_hash_queue_timeout_seconds,
+    )
+
+
+password_hasher = _build_hasher()
+
+
 def _create_token(subject: str, token_type: str, expires_minutes: int, extra: dict[str, Any] | None = None) -> str:
     settings = get_settings()
     now = datetime.now(timezone.utc)
@@ -29,9 +88,9 @@ def _create_token(subject: str, token_type: str, expires_minutes: int, extra: di
     return jwt.encode(payload, settings.secret_key, algorithm=settings.algorithm)
 
 
-def create_access_token(subject: str) -> str:
+def create_access_token(subject: str, claims: dict[str, Any] | None = None) -> str:
     settings = get_settings()
-    return _create_token(subject, "access", settings.access_token_expire_minutes)
+    return _create_token(subject, "access", settings.access_token_expire_minutes, claims)
 
 
 def create_refresh_token(subject: str) -> str:
@@ -0,0 +1,137 @@
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import aclosing
+from typing import Any, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call:
+    def __init__(self, task: asyncio.Task) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight(Generic[T]):
+    """Share one in-flight awaitable between concurrent callers with the same key.
+
+    ``do`` returns the result and whether it was shared, i.e. this caller joined a call that another one started.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[str, _Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        call = self._calls.get(key)
+        shared = call is not None
+        if call is None:
+            task = asyncio.ensure_future(fn())
+            call = _Call(task)
+            self._calls[key] = call
+            task.add_done_callback(lambda _, k=key, c=call: self._forget(k, c))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task), shared
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.task.cancelled():
+            # Mark the exception retrieved so an unobserved failure doesn't log a warning.
+            call.task.exception()
+
+    def stats(self) -> dict[str, int]:
+        return {"in_flight": len(self._calls), "leaders": self.leaders, "coalesced": self.coalesced}
+
+
+class _Broadcast:
+    def __init__(self) -> None:
+        self.items: list[Any] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.subscribers = 0
+        self.task: asyncio.Task | None = None
+        self._changed = asyncio.Event()
+
+    def publish(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait(self) -> None:
+        await self._changed.wait()
+
+
+class StreamFlight(Generic[T]):
+    """Fan out one upstream async iterator to every concurrent subscriber with the same key.
+
+    ``subscribe`` yields ``(item, shared)``; ``shared`` is true for subscribers that joined a stream another one started.
+    """
+
+    def __init__(self) -> None:
+        self._streams: dict[str, _Broadcast] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def subscribe(self, key: str, source: Callable[[], AsyncIterator[T]]) -> AsyncIterator[tuple[T, bool]]:
+        broadcast = self._streams.get(key)
+        shared = broadcast is not None
+        if broadcast is None:
+            broadcast = _Broadcast()
+            self._streams[key] = broadcast
+            broadcast.task = asyncio.create_task(self._pump(key, broadcast, source))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        broadcast.subscribers += 1
+        index = 0
+        try:
+            while True:
+                while index < len(broadcast.items):
+                    yield broadcast.items[index], shared
+                    index += 1
+                if broadcast.done:
+                    if broadcast.error is not None:
+                        raise broadcast.error
+                    return
+                await broadcast.wait()
+        finally:
+            broadcast.subscribers -= 1
+            if broadcast.subscribers == 0 and broadcast.task is not None and not broadcast.task.done():
+                broadcast.task.cancel()
+
+    async def _pump(self, key: str, broadcast: _Broadcast, source: Callable[[], AsyncIterator[T]]) -> None:
+        try:
+            async with aclosing(source()) as items:
+                async for item in items:
+                    broadcast.items.append(item)
+                    broadcast.publish()
+        except asyncio.CancelledError:
+            broadcast.error = RuntimeError("Upstream stream was cancelled")
+            raise
+        except Exception as exc:
+            broadcast.error = exc
+        finally:
+            broadcast.done = True
+            if self._streams.get(key) is broadcast:
+                del self._streams[key]
+            broadcast.publish()
+
+    def stats(self) -> dict[str, int]:
+        return {"in_flight": len(self._streams), "leaders": self.leaders, "coalesced": self.coalesced}
+
+
+completion_flights: SingleFlight[dict[str, Any]] = SingleFlight()
+stream_flights: StreamFlight[Any] = StreamFlight()
@@ -0,0 +1,92 @@
+import asyncio
+import json
+from collections.abc import AsyncIterator
+from contextlib import aclosing
+from json.encoder import encode_basestring
+
+from app.core.llm_client import StreamChunk
+
+TOKEN_FRAME_PREFIX = 'data: {"type":"token","value":'
+TOKEN_FRAME_SUFFIX = "}\n\n"
+DONE_FRAME = 'data: {"type":"done"}\n\n'
+
+
+def token_frame(text: str) -> str:
+    # Only the string needs escaping; the rest of the frame is a constant template.
+    return TOKEN_FRAME_PREFIX + encode_basestring(text) + TOKEN_FRAME_SUFFIX
+
+
+def event_frame(event_type: str, value: str) -> str:
+    return f"data: {json.dumps({'type': event_type, 'value': value})}\n\n"
+
+
+async def coalesce_chunks(source: AsyncIterator[StreamChunk], window_seconds: float, max_chars: int) -> AsyncIterator[StreamChunk]:
+    """Merge content chunks that arrive within ``window_seconds`` of each other, up to ``max_chars`` per chunk.
+
+    A pump task drains ``source`` into a buffer; the buffer is flushed when the window timer fires,
+    when it reaches ``max_chars``, or when the source ends. The first content chunk is flushed
+    immediately so time-to-first-token is unchanged.
+    """
+    if window_seconds <= 0:
+        async with aclosing(source) as chunks:
+            async for chunk in chunks:
+                yield chunk
+        return
+
+    loop = asyncio.get_running_loop()
+    wake = asyncio.Event()
+    buffer: list[str] = []
+    size = 0
+    cached = False
+    first = True
+    finished = False
+    usage: StreamChunk | None = None
+    error: Exception | None = None
+    timer: asyncio.TimerHandle | None = None
+
+    async def pump() -> None:
+        nonlocal size, cached, first, finished, usage, error, timer
+        try:
+            async for chunk in source:
+                if chunk.content:
+                    buffer.append(chunk.content)
+                    size += len(chunk.content)
+                    cached = chunk.cached
+                    if first or size >= max_chars:
+                        first = False
+                        wake.set()
+                    elif timer is None:
+                        timer = loop.call_later(window_seconds, wake.set)
+                if chunk.usage:
+                    usage = chunk
+        except Exception as exc:
+            error = exc
+        finally:
+            finished = True
+            wake.set()
+
+    task = asyncio.create_task(pump())
+    try:
+        while True:
+            await wake.wait()
+            wake.clear()
+            if timer is not None:
+                timer.cancel()
+                timer = None
+            if buffer:
+                text = "".join(buffer)
+                buffer.clear()
+                size = 0
+                yield StreamChunk(content=text, cached=cached)
+            if finished and not buffer:
+                if error is not None:
+                    raise error
+                if usage is not None:
+                    yield usage
+                return
+    finally:
+        if timer is not None:
+            timer.cancel()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await source.aclose()
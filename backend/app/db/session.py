@@ -1,12 +1,203 @@
+import time
 from collections.abc import AsyncGenerator
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from typing import Any
+
+from sqlalchemy import event, make_url, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
 from app.core.config import get_settings
+from app.core.metrics import db_pool_timeouts, db_pool_wait, db_query_duration, statement_verb
+
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a free connection."""
+
+    # Log under the stock pool's name, so sqlalchemy.pool level settings and echo_pool still apply to it.
+    _sqla_logger_namespace = "sqlalchemy.pool.impl.AsyncAdaptedQueuePool"
+    metric_label = "primary"
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            db_pool_timeouts.inc(self.metric_label)
+            raise
+        waited = time.perf_counter() - started
+        db_pool_wait.observe(self.metric_label, value=waited)
+        self.checkouts += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        return connection
+
+    def recreate(self) -> "MeteredQueuePool":
+        pool = super().recreate()
+        pool.metric_label = self.metric_label
+        return pool
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "overflow": self.overflow(),
+            "idle": self.checkedin(),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+        }
+
+
+def is_sqlite_file(database_url: str) -> bool:
+    url = make_url(database_url)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def sqlite_pragmas(read_only: bool) -> list[str]:
+    settings = get_settings()
+    pragmas = [
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        f"PRAGMA mmap_size={settings.sqlite_mmap_bytes}",
+        f"PRAGMA cache_size=-{settings.sqlite_cache_kib}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+
+def build_engine(database_url: str, read_only: bool = False, label: str = "primary") -> AsyncEngine:
+    settings = get_settings()
+    url = make_url(database_url)
+    options: dict[str, Any] = {"echo": settings.debug, "future": True}
+    if url.get_backend_name() == "sqlite" and not is_sqlite_file(database_url):
+        # In-memory SQLite lives and dies with its single connection; leave SQLAlchemy's default pool.
+        return create_async_engine(url, **options)
+
+    options.update(
+        poolclass=MeteredQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout_seconds,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+    sqlite_wal = is_sqlite_file(database_url) and settings.sqlite_wal_enabled
+    if sqlite_wal:
+        # SQLite allows one writer at a time. Giving the write engine a single connection queues writers
+        # in the pool instead of letting them race for the file lock; WAL lets readers run alongside it.
+        options.update(pool_size=settings.sqlite_read_connections if read_only else 1, max_overflow=0)
+    if url.get_driver_name() == "asyncpg":
+        connect_args: dict[str, Any] = {"prepared_statement_cache_size": settings.db_statement_cache_size}
+        if settings.db_statement_cache_size == 0:
+            # Behind PgBouncer in transaction mode, asyncpg's own statement cache must be off too.
+            connect_args["statement_cache_size"] = 0
+        options["connect_args"] = connect_args
+    built = create_async_engine(url, **options)
+    built.sync_engine.pool.metric_label = label
+    instrument_queries(built, label)
+    if sqlite_wal:
+        pragmas = sqlite_pragmas(read_only)
+
+        @event.listens_for(built.sync_engine, "connect")
+        def _apply_pragmas(dbapi_connection, _record) -> None:
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+
+    return built
+
+
+def instrument_queries(target: AsyncEngine, label: str) -> None:
+    """Feed statement execution times into the query duration histogram."""
+
+    @event.listens_for(target.sync_engine, "before_cursor_execute")
+    def _started(connection, _cursor, _statement, _parameters, _context, _executemany) -> None:
+        connection.info["query_started"] = time.perf_counter()
+
+    @event.listens_for(target.sync_engine, "after_cursor_execute")
+    def _finished(connection, _cursor, statement, _parameters, _context, _executemany) -> None:
+        started = connection.info.pop("query_started", None)
+        if started is not None:
+            db_query_duration.observe(label, statement_verb(statement), value=time.perf_counter() - started)
+
+
+def pool_stats(target: AsyncEngine) -> dict[str, Any]:
+    pool = target.sync_engine.pool
+    return pool.stats() if isinstance(pool, MeteredQueuePool) else {"pool": type(pool).__name__, "status": pool.status()}
+
 
 settings = get_settings()
-engine = create_async_engine(settings.database_url, echo=settings.debug, future=True)
+engine = build_engine(settings.database_url)
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
+# Reads that must see every commit. In SQLite WAL mode they get their own pool of read-only connections
+# to the same file, so they never queue behind the single writer; otherwise they share the primary.
+if is_sqlite_file(settings.database_url) and settings.sqlite_wal_enabled:
+    read_engine = build_engine(settings.database_url, read_only=True, label="reader")
+else:
+    read_engine = engine
+ReadSessionLocal = async_sessionmaker(read_engine, expire_on_commit=False, class_=AsyncSession) if read_engine is not engine else AsyncSessionLocal
+
+# Reads that tolerate replication lag may go to DATABASE_READ_URL.
+if settings.database_read_url:
+    replica_engine = build_engine(settings.database_read_url, read_only=True, label="replica")
+else:
+    replica_engine = read_engine
+ReplicaSessionLocal = (
+    async_sessionmaker(replica_engine, expire_on_commit=False, class_=AsyncSession) if replica_engine is not read_engine else ReadSessionLocal
+)
+
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         yield session
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """Session for endpoints that only read, and must see the request's own earlier writes."""
+    async with ReadSessionLocal() as session:
+        yield session
+
+
+async def get_replica_db() -> AsyncGenerator[AsyncSession, None]:
+    """Session for reads that may lag the primary by the replica's replication delay."""
+    async with ReplicaSessionLocal() as session:
+        yield session
+
+
+def _engines() -> dict[str, AsyncEngine]:
+    engines = {"primary": engine}
+    if read_engine is not engine:
+        engines["reader"] = read_engine
+    if replica_engine is not read_engine:
+        engines["replica"] = replica_engine
+    return engines
+
+
+async def check_engines() -> None:
+    for target in _engines().values():
+        async with target.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+
+async def dispose_engines() -> None:
+    for target in _engines().values():
+        await target.dispose()
+
+
+def engine_stats() -> dict[str, Any]:
+    return {name: pool_stats(target) for name, target in _engines().items()}
@@ -1,29 +1,53 @@
 import logging
-import time
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from sqlalchemy import text
+from fastapi.responses import JSONResponse, Response
 
 from app.api.auth_routes import router as auth_router
 from app.api.chat_routes import router as chat_router
 from app.api.user_routes import router as user_router
+from app.core.admission import admission_controller
+from app.core.circuit_breaker import provider_guard
 from app.core.config import get_settings
-from app.db.session import engine
+from app.core.http_pool import provider_pool
+from app.core.latency import latency_tracker
+from app.core.llm_cache import completion_cache
+from app.core.metrics import CONTENT_TYPE, MetricsMiddleware, registry
+from app.core.rate_limit import rate_limiter
+from app.core.request_log import RequestLogMiddleware, build_log_shipper
+from app.core.security import password_hasher
+from app.core.singleflight import completion_flights, stream_flights
+from app.db.session import check_engines, dispose_engines, engine_stats
+from app.services.auth_service import user_cache
+from app.services.conversation_cache import conversation_windows
+from app.services.pagination import AFTER_HEADER, BEFORE_HEADER
+from app.services.turn_writer import turn_writer
+from app.services.usage_ingest import usage_ingestor
 
 settings = get_settings()
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+# Installed on the root logger by the lifespan, so importing the app has no logging side effects.
+log_shipper = build_log_shipper(settings.log_format, settings.log_queue_size)
 logger = logging.getLogger("nova-bot")
 
 
 @asynccontextmanager
 async def lifespan(_: FastAPI):
-    async with engine.begin() as conn:
-        await conn.execute(text("SELECT 1"))
-    yield
+    log_shipper.install(logging.getLogger(), settings.log_level)
+    await check_engines()
+    await provider_pool.open(warm=settings.provider_warmup)
+    try:
+        yield
+    finally:
+        await turn_writer.close()
+        await usage_ingestor.close()
+        await provider_pool.close()
+        await rate_limiter.close()
+        password_hasher.close()
+        await dispose_engines()
+        log_shipper.stop()
 
 
 app = FastAPI(title=settings.app_name, version="1.0.0", lifespan=lifespan)
@@ -34,16 +58,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[BEFORE_HEADER, AFTER_HEADER],
 )
-
-
-@app.middleware("http")
-async def request_logger(request: Request, call_next):
-    start = time.perf_counter()
-    response = await call_next(request)
-    duration_ms = round((time.perf_counter() - start) * 1000, 2)
-    logger.info("%s %s -> %s (%sms)", request.method, request.url.path, response.status_code, duration_ms)
-    return response
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestLogMiddleware, sample_rate=settings.request_log_sample_rate, slow_ms=settings.request_log_slow_ms)
 
 
 @app.exception_handler(Exception)
@@ -60,3 +79,60 @@ app.include_router(user_router, prefix=settings.api_prefix)
 @app.get("/")
 async def root():
     return {"service": settings.app_name, "status": "ok"}
+
+
+@app.get("/health/providers")
+async def provider_health():
+    return provider_pool.stats()
+
+
+@app.get("/health/latency")
+async def latency_health():
+    return latency_tracker.stats()
+
+
+@app.get("/health/cache")
+async def cache_health():
+    return {
+        **completion_cache.stats(),
+        "coalescing": {"complete": completion_flights.stats(), "stream": stream_flights.stats()},
+        "conversations": conversation_windows.stats(),
+        "users": user_cache.stats(),
+    }
+
+
+@app.get("/health/ratelimit")
+async def ratelimit_health():
+    return rate_limiter.stats()
+
+
+@app.get("/health/admission")
+async def admission_health():
+    return {**admission_controller.stats(), password_hasher.gate.key: password_hasher.stats()}
+
+
+@app.get("/health/breakers")
+async def breaker_health():
+    return provider_guard.stats()
+
+
+@app.get("/health/db")
+async def db_health():
+    return engine_stats()
+
+
+@app.get("/health/persistence")
+async def persistence_health():
+    return {"turns": turn_writer.stats(), "usage": usage_ingestor.stats()}
+
+
+@app.get("/health/logging")
+async def logging_health():
+    return log_shipper.stats()
+
+
+if settings.metrics_enabled:
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -1,5 +1,5 @@
 from app.models.user import User
 from app.models.chat import Conversation, Message
-from app.models.usage import UsageLog
+from app.models.usage import UsageDaily, UsageLog
 
-__all__ = ["User", "Conversation", "Message", "UsageLog"]
+__all__ = ["User", "Conversation", "Message", "UsageLog", "UsageDaily"]
@@ -1,4 +1,4 @@
-from sqlalchemy import ForeignKey, String, Text
+from sqlalchemy import Boolean, ForeignKey, Index, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
 from app.models.mixins import IDMixin, TimestampMixin
@@ -6,11 +6,14 @@ from app.models.mixins import IDMixin, TimestampMixin
 
 class Conversation(Base, IDMixin, TimestampMixin):
     __tablename__ = "conversations"
+    __table_args__ = (Index("ix_conversations_user_updated", "user_id", "updated_at", "id"),)
 
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     title: Mapped[str] = mapped_column(String(255), nullable=False, default="New Chat")
     model: Mapped[str] = mapped_column(String(120), nullable=False, default="gpt-4o-mini")
     system_prompt: Mapped[str] = mapped_column(Text, nullable=False, default="I am Nova Bot, your helpful AI assistant.")
+    summary: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    summary_message_id: Mapped[int] = mapped_column(default=0, nullable=False)
 
     user = relationship("User", back_populates="conversations")
     messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
@@ -18,12 +21,14 @@ class Conversation(Base, IDMixin, TimestampMixin):
 
 class Message(Base, IDMixin, TimestampMixin):
     __tablename__ = "messages"
+    __table_args__ = (Index("ix_messages_conversation_created", "conversation_id", "created_at", "id"),)
 
-    conversation_id: Mapped[int] = mapped_column(ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False, index=True)
+    conversation_id: Mapped[int] = mapped_column(ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False)
     role: Mapped[str] = mapped_column(String(20), nullable=False)
     content: Mapped[str] = mapped_column(Text, nullable=False)
     prompt_tokens: Mapped[int] = mapped_column(default=0, nullable=False)
     completion_tokens: Mapped[int] = mapped_column(default=0, nullable=False)
     total_tokens: Mapped[int] = mapped_column(default=0, nullable=False)
+    cached: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
 
     conversation = relationship("Conversation", back_populates="messages")
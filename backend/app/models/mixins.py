@@ -9,4 +9,4 @@ class TimestampMixin:
 
 
 class IDMixin:
-    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(primary_key=True)
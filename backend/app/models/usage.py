@@ -1,5 +1,6 @@
+from datetime import date
 from decimal import Decimal
-from sqlalchemy import ForeignKey, String
+from sqlalchemy import Boolean, Date, ForeignKey, Index, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
 from app.models.mixins import IDMixin, TimestampMixin
@@ -7,13 +8,37 @@ from app.models.mixins import IDMixin, TimestampMixin
 
 class UsageLog(Base, IDMixin, TimestampMixin):
     __tablename__ = "usage_logs"
+    __table_args__ = (
+        Index(
+            "ix_usage_logs_user_created",
+            "user_id",
+            "created_at",
+            postgresql_include=["model", "prompt_tokens", "completion_tokens", "total_tokens", "estimated_cost_usd"],
+        ),
+    )
 
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     conversation_id: Mapped[int | None] = mapped_column(ForeignKey("conversations.id", ondelete="SET NULL"), nullable=True)
     model: Mapped[str] = mapped_column(String(120), nullable=False)
     prompt_tokens: Mapped[int] = mapped_column(default=0, nullable=False)
     completion_tokens: Mapped[int] = mapped_column(default=0, nullable=False)
     total_tokens: Mapped[int] = mapped_column(default=0, nullable=False)
     estimated_cost_usd: Mapped[Decimal] = mapped_column(default=Decimal("0.0000"), nullable=False)
+    cached: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
 
     user = relationship("User", back_populates="usage_logs")
+
+
+class UsageDaily(Base):
+    """Per user, day and model totals, kept in step with usage_logs by the usage writer."""
+
+    __tablename__ = "usage_daily"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    model: Mapped[str] = mapped_column(String(120), primary_key=True)
+    requests: Mapped[int] = mapped_column(default=0, nullable=False)
+    prompt_tokens: Mapped[int] = mapped_column(default=0, nullable=False)
+    completion_tokens: Mapped[int] = mapped_column(default=0, nullable=False)
+    total_tokens: Mapped[int] = mapped_column(default=0, nullable=False)
+    estimated_cost_usd: Mapped[Decimal] = mapped_column(default=Decimal("0.0000"), nullable=False)
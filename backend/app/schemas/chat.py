@@ -31,6 +31,7 @@ class MessageOut(BaseModel):
     prompt_tokens: int
     completion_tokens: int
     total_tokens: int
+    cached: bool = False
     created_at: datetime
 
     class Config:
@@ -44,6 +45,7 @@ class ChatSendRequest(BaseModel):
     max_tokens: int | None = Field(default=None, ge=1, le=4000)
     model: str | None = Field(default=None, max_length=120)
     system_prompt: str | None = Field(default=None, max_length=8000)
+    cache: bool = False
 
 
 class ChatSendResponse(BaseModel):
@@ -54,3 +56,5 @@ class ChatSendResponse(BaseModel):
 class ChatHistoryResponse(BaseModel):
     conversation: ConversationOut
     messages: list[MessageOut]
+    before: str | None = None
+    after: str | None = None
@@ -1,4 +1,7 @@
+from datetime import date
 from decimal import Decimal
+from typing import Literal
+
 from pydantic import BaseModel
 
 
@@ -7,3 +10,20 @@ class UsageSummary(BaseModel):
     total_completion_tokens: int
     total_tokens: int
     total_estimated_cost_usd: Decimal
+
+
+class UsageBucket(BaseModel):
+    day: date | None = None
+    model: str | None = None
+    requests: int
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    estimated_cost_usd: Decimal
+
+
+class UsageBreakdown(BaseModel):
+    start: date
+    end: date
+    group_by: Literal["day", "model", "day_model"]
+    buckets: list[UsageBucket]
@@ -1,16 +1,173 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
 
+from app.core.config import get_settings
 from app.core.security import TokenError, decode_token
-from app.db.session import get_db
+from app.db.session import ReadSessionLocal
 from app.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> User:
+@dataclass(slots=True, frozen=True)
+class UserSnapshot:
+    """The authenticated user as request handlers see it; detached from any session."""
+
+    id: int
+    email: str
+    full_name: str | None
+    is_active: bool
+    is_admin: bool
+    created_at: datetime
+
+    @classmethod
+    def from_model(cls, user: User) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            is_active=user.is_active,
+            is_admin=user.is_admin,
+            created_at=user.created_at,
+        )
+
+    @classmethod
+    def from_claims(cls, user_id: int, payload: dict[str, Any], is_active: bool, is_admin: bool) -> "UserSnapshot | None":
+        """Profile fields from the token; the access flags are passed in from the database."""
+        if "email" not in payload or "joined" not in payload:
+            return None
+        return cls(
+            id=user_id,
+            email=payload["email"],
+            full_name=payload.get("name"),
+            is_active=is_active,
+            is_admin=is_admin,
+            created_at=datetime.fromisoformat(payload["joined"]),
+        )
+
+
+def access_token_claims(user: User) -> dict[str, Any] | None:
+    """Profile claims to embed in access tokens when AUTH_TOKEN_CLAIMS is on."""
+    if not get_settings().auth_token_claims:
+        return None
+    return {"email": user.email, "name": user.full_name, "joined": user.created_at.isoformat()}
+
+
+class UserCache:
+    """Short-lived cache of authenticated users, so warm requests skip the users lookup.
+
+    Entries are dropped once an ORM change to the user commits. Changes made elsewhere (another
+    worker, raw SQL) are picked up once the TTL expires.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[int, tuple[float, UserSnapshot]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.claims = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def get(self, user_id: int) -> UserSnapshot | None:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        loaded_at, user = entry
+        if time.monotonic() - loaded_at > self.ttl_seconds:
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return user
+
+    def put(self, user: UserSnapshot) -> None:
+        if not self.enabled:
+            return
+        self._entries[user.id] = (time.monotonic(), user)
+        self._entries.move_to_end(user.id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        self._entries.pop(user_id, None)
+        self.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "claims": self.claims,
+            "invalidations": self.invalidations,
+        }
+
+
+def _build_cache() -> UserCache:
+    settings = get_settings()
+    ttl_seconds = settings.auth_cache_ttl_seconds if settings.auth_cache_enabled else 0.0
+    return UserCache(ttl_seconds=ttl_seconds, max_entries=settings.auth_cache_max_entries)
+
+
+user_cache = _build_cache()
+
+
+_CHANGED_USERS = "nova_changed_users"
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _remember_changed_user(mapper, connection, target: User) -> None:
+    # Flushed is not committed: invalidating now would let a concurrent request cache the old row again.
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_CHANGED_USERS, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session: Session) -> None:
+    for user_id in session.info.pop(_CHANGED_USERS, ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_users(session: Session) -> None:
+    session.info.pop(_CHANGED_USERS, None)
+
+
+async def _load_user(user_id: int, payload: dict[str, Any]) -> UserSnapshot | None:
+    # A short read-only session of its own: it never pins a connection for the rest of the request, and in
+    # SQLite WAL mode it doesn't queue behind the single writer connection.
+    async with ReadSessionLocal() as db:
+        if get_settings().auth_token_claims and "email" in payload:
+            # The token carries the profile; only the access flags need the database, and they always come from it.
+            flags = (await db.execute(select(User.is_active, User.is_admin).where(User.id == user_id))).one_or_none()
+            if flags is None:
+                return None
+            user = UserSnapshot.from_claims(user_id, payload, flags.is_active, flags.is_admin)
+            if user is not None:
+                user_cache.claims += 1
+                return user
+        row = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
+    return UserSnapshot.from_model(row) if row else None
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserSnapshot:
     try:
         payload = decode_token(token, expected_type="access")
     except TokenError as exc:
@@ -20,8 +177,17 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
     if not subject:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
 
-    result = await db.execute(select(User).where(User.id == int(subject)))
-    user = result.scalar_one_or_none()
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    user_id = int(subject)
+    user = user_cache.get(user_id)
+    if user is not None:
+        user_cache.hits += 1
+    else:
+        user_cache.misses += 1
+        user = await _load_user(user_id, payload)
+        if user is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        user_cache.put(user)
+
+    if not user.is_active:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User is inactive")
     return user
@@ -0,0 +1,226 @@
+import asyncio
+import logging
+from collections.abc import Sequence
+from functools import lru_cache
+from typing import Any
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.db.session import AsyncSessionLocal, ReadSessionLocal
+from app.models.chat import Conversation, Message
+from app.services.conversation_cache import conversation_windows
+from app.services.usage_ingest import UsageRecord, usage_ingestor
+
+try:
+    import tiktoken
+except ImportError:  # pinned in requirements.txt; without it, fall back to a character-based estimate
+    tiktoken = None
+
+logger = logging.getLogger("nova-bot.context")
+
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_HEADER = "Summary of the earlier conversation:"
+SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a chat between a user and an assistant. "
+    "Merge the new turns into the existing summary. Keep facts, names, decisions, open questions and user preferences. "
+    "Reply with the updated summary only, in plain prose."
+)
+
+_summarizing: set[int] = set()
+_summary_tasks: set[asyncio.Task] = set()
+
+
+@lru_cache(maxsize=16)
+def _encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model: str) -> int:
+    if not text:
+        return 0
+    if tiktoken is not None and not model.startswith("gemini"):
+        return len(_encoding(model).encode(text))
+    return len(text) // 4 + 1
+
+
+def message_tokens(message: Message, model: str) -> int:
+    if message.role == "assistant" and message.completion_tokens:
+        return message.completion_tokens + MESSAGE_OVERHEAD_TOKENS
+    return count_tokens(message.content, model) + MESSAGE_OVERHEAD_TOKENS
+
+
+def context_budget(model: str) -> int:
+    settings = get_settings()
+    return settings.context_model_budgets.get(model, settings.context_token_budget)
+
+
+def history_budget(conversation: Conversation, model: str) -> int:
+    settings = get_settings()
+    return context_budget(model) - count_tokens(conversation.system_prompt, model) - settings.context_summary_max_tokens - MESSAGE_OVERHEAD_TOKENS
+
+
+def system_message(conversation: Conversation) -> dict[str, str]:
+    if not conversation.summary:
+        return {"role": "system", "content": conversation.system_prompt}
+    return {"role": "system", "content": f"{conversation.system_prompt}\n\n{SUMMARY_HEADER}\n{conversation.summary}"}
+
+
+def fit_history(history: Sequence[Message], budget: int, model: str) -> list[Message]:
+    kept: list[Message] = []
+    used = 0
+    for message in reversed(history):
+        cost = message_tokens(message, model)
+        if used + cost > budget:
+            break
+        kept.append(message)
+        used += cost
+    kept.reverse()
+    return kept
+
+
+async def load_unsummarized(db: AsyncSession, conversation: Conversation) -> list[Message]:
+    settings = get_settings()
+    result = await db.execute(
+        select(Message)
+        .where(Message.conversation_id == conversation.id, Message.id > conversation.summary_message_id)
+        .order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(settings.context_max_messages)
+    )
+    return list(reversed(result.scalars().all()))
+
+
+async def load_overflow(db: AsyncSession, conversation: Conversation, before_id: int) -> list[Message]:
+    """Unsummarized messages older than ``before_id``, oldest first: the turns that fell out of the context window."""
+    settings = get_settings()
+    result = await db.execute(
+        select(Message)
+        .where(Message.conversation_id == conversation.id, Message.id > conversation.summary_message_id, Message.id < before_id)
+        .order_by(Message.created_at.asc(), Message.id.asc())
+        .limit(settings.context_max_messages)
+    )
+    return list(result.scalars().all())
+
+
+def build_context_messages(conversation: Conversation, history: Sequence[Message], user_text: str, model: str) -> list[dict[str, str]]:
+    budget = history_budget(conversation, model) - count_tokens(user_text, model) - MESSAGE_OVERHEAD_TOKENS
+    messages = [system_message(conversation)]
+    messages.extend({"role": m.role, "content": m.content} for m in fit_history(history, max(budget, 0), model))
+    messages.append({"role": "user", "content": user_text})
+    return messages
+
+
+def _split_for_summary(history: Sequence[Message], budget: int, model: str) -> list[Message]:
+    settings = get_settings()
+    costs = [message_tokens(m, model) for m in history]
+    total = sum(costs)
+    if total <= budget * settings.context_summary_trigger_ratio:
+        return []
+    keep_target = budget * settings.context_summary_keep_ratio
+    fold = 0
+    while fold < len(history) and total > keep_target:
+        total -= costs[fold]
+        fold += 1
+    return _whole_turns(history, fold)
+
+
+def _oldest_batch(history: Sequence[Message], budget: int, model: str) -> list[Message]:
+    fold = used = 0
+    while fold < len(history) and (fold == 0 or used + message_tokens(history[fold], model) <= budget):
+        used += message_tokens(history[fold], model)
+        fold += 1
+    return _whole_turns(history, fold)
+
+
+def _whole_turns(history: Sequence[Message], fold: int) -> list[Message]:
+    # Never split a user turn from the assistant reply that follows it.
+    while fold < len(history) and history[fold].role == "assistant":
+        fold += 1
+    return list(history[:fold])
+
+
+async def update_summary(llm_client: Any, conversation_id: int, model: str) -> None:
+    settings = get_settings()
+    window = conversation_windows.get(conversation_id)
+    if (
+        window is not None
+        and len(window.messages) < settings.context_max_messages
+        and not _split_for_summary(list(window.messages), history_budget(window.conversation, model), model)
+    ):
+        return
+    # One batch per pass, until the unsummarized history fits again.
+    while await _fold_batch(llm_client, conversation_id, model):
+        pass
+
+
+async def _fold_batch(llm_client: Any, conversation_id: int, model: str) -> bool:
+    settings = get_settings()
+    async with ReadSessionLocal() as db:
+        conversation = await db.get(Conversation, conversation_id)
+        if conversation is None:
+            return False
+        history = await load_unsummarized(db, conversation)
+        overflow = await load_overflow(db, conversation, history[0].id) if len(history) >= settings.context_max_messages else []
+    budget = history_budget(conversation, model)
+    # Turns past the message cap never reach the model again except through the summary, so they go first.
+    folded = _oldest_batch(overflow, budget, model) if overflow else _split_for_summary(history, budget, model)
+    if not folded:
+        return False
+    # Fold at most a budget's worth per summarization call; update_summary keeps going until the history fits.
+    folded = _oldest_batch(folded, budget, model)
+
+    transcript = "\n".join(f"{m.role}: {m.content}" for m in folded)
+    prompt = [
+        {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+        {"role": "user", "content": f"Existing summary:\n{conversation.summary or '(none)'}\n\nNew turns:\n{transcript}"},
+    ]
+    # The provider call can take seconds, so it runs with no transaction (and no pooled connection) held.
+    result = await llm_client.complete(prompt, model=model, temperature=0.2, max_tokens=settings.context_summary_max_tokens, priority="batch")
+
+    changes = {"summary": result["content"], "summary_message_id": folded[-1].id}
+    async with AsyncSessionLocal() as db:
+        updated = await db.execute(
+            update(Conversation)
+            .where(Conversation.id == conversation_id, Conversation.summary_message_id == conversation.summary_message_id)
+            .values(**changes)
+        )
+        await db.commit()
+    # The summary's tokens are billed to the user like a reply. If the update missed, another worker folded these
+    # turns first or the conversation is gone; either way the usage row isn't linked to it.
+    await usage_ingestor.submit(
+        UsageRecord(
+            user_id=conversation.user_id,
+            conversation_id=conversation_id if updated.rowcount else None,
+            model=result["model"],
+            prompt_tokens=result["prompt_tokens"],
+            completion_tokens=result["completion_tokens"],
+            total_tokens=result["total_tokens"],
+            cached=result["cached"],
+        )
+    )
+    if updated.rowcount == 0:
+        return False
+    conversation_windows.update(conversation_id, **changes)
+    return True
+
+
+def schedule_summary_update(llm_client: Any, conversation_id: int, model: str) -> None:
+    if not get_settings().context_summary_enabled or conversation_id in _summarizing:
+        return
+
+    async def runner() -> None:
+        try:
+            await update_summary(llm_client, conversation_id, model)
+        except Exception as exc:
+            logger.warning("Summary update failed for conversation %s: %s", conversation_id, exc)
+        finally:
+            _summarizing.discard(conversation_id)
+
+    _summarizing.add(conversation_id)
+    task = asyncio.create_task(runner())
+    _summary_tasks.add(task)
+    task.add_done_callback(_summary_tasks.discard)
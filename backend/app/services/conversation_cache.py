@@ -0,0 +1,213 @@
+import sys
+import time
+from collections import OrderedDict, deque
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.chat import Conversation, Message
+
+SNAPSHOT_OVERHEAD_BYTES = 200
+
+
+@dataclass(slots=True)
+class ConversationSnapshot:
+    id: int
+    user_id: int
+    title: str
+    model: str
+    system_prompt: str
+    summary: str
+    summary_message_id: int
+
+    @classmethod
+    def from_model(cls, conversation: Conversation) -> "ConversationSnapshot":
+        return cls(
+            id=conversation.id,
+            user_id=conversation.user_id,
+            title=conversation.title,
+            model=conversation.model,
+            system_prompt=conversation.system_prompt,
+            summary=conversation.summary,
+            summary_message_id=conversation.summary_message_id,
+        )
+
+
+@dataclass(slots=True)
+class MessageSnapshot:
+    id: int
+    role: str
+    content: str
+    completion_tokens: int = 0
+
+    @classmethod
+    def from_model(cls, message: Message) -> "MessageSnapshot":
+        return cls(id=message.id, role=message.role, content=message.content, completion_tokens=message.completion_tokens or 0)
+
+
+@dataclass(slots=True)
+class ConversationWindow:
+    conversation: ConversationSnapshot
+    messages: deque[MessageSnapshot]
+    loaded_at: float = field(default_factory=time.monotonic)
+    size_bytes: int = 0
+
+    @property
+    def last_message_id(self) -> int:
+        # The tail holds the newest messages; an empty tail means everything up to the summary was folded.
+        return self.messages[-1].id if self.messages else self.conversation.summary_message_id
+
+    def version(self) -> tuple[Any, ...]:
+        conversation = self.conversation
+        return (conversation.title, conversation.model, conversation.summary_message_id, self.last_message_id)
+
+    def measure(self) -> int:
+        conversation = self.conversation
+        size = SNAPSHOT_OVERHEAD_BYTES + sys.getsizeof(conversation.system_prompt) + sys.getsizeof(conversation.summary) + sys.getsizeof(conversation.title)
+        size += sum(SNAPSHOT_OVERHEAD_BYTES + sys.getsizeof(m.content) for m in self.messages)
+        self.size_bytes = size
+        return size
+
+
+class ConversationWindowCache:
+    """Write-through cache of each hot conversation plus its unsummarized message tail.
+
+    Another worker can change or delete a conversation behind this one's back, so every hit is
+    checked against a one-row version query before it is served.
+    """
+
+    def __init__(self, max_bytes: int, max_messages: int, ttl_seconds: float) -> None:
+        self.max_bytes = max_bytes
+        self.max_messages = max_messages
+        self.ttl_seconds = ttl_seconds
+        self._windows: OrderedDict[int, ConversationWindow] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, conversation_id: int) -> ConversationWindow | None:
+        window = self._windows.get(conversation_id)
+        if window is None:
+            return None
+        if time.monotonic() - window.loaded_at > self.ttl_seconds:
+            self.invalidate(conversation_id)
+            return None
+        self._windows.move_to_end(conversation_id)
+        return window
+
+    async def get_or_load(self, db: AsyncSession, conversation_id: int, user_id: int) -> ConversationWindow:
+        window = self.get(conversation_id)
+        if window is not None:
+            if window.conversation.user_id != user_id:
+                raise HTTPException(status_code=404, detail="Conversation not found")
+            current = (await db.execute(self._version_query(conversation_id, user_id))).one_or_none()
+            if current is None:
+                self.invalidate(conversation_id)
+                raise HTTPException(status_code=404, detail="Conversation not found")
+            if tuple(current) == window.version():
+                self.hits += 1
+                return window
+            self.stale += 1
+
+        self.misses += 1
+        result = await db.execute(select(Conversation).where(Conversation.id == conversation_id, Conversation.user_id == user_id))
+        conversation = result.scalar_one_or_none()
+        if not conversation:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+        result = await db.execute(
+            select(Message)
+            .where(Message.conversation_id == conversation.id, Message.id > conversation.summary_message_id)
+            .order_by(Message.created_at.desc(), Message.id.desc())
+            .limit(self.max_messages)
+        )
+        messages = [MessageSnapshot.from_model(m) for m in reversed(result.scalars().all())]
+        window = ConversationWindow(conversation=ConversationSnapshot.from_model(conversation), messages=deque(messages, maxlen=self.max_messages))
+        self._store(window)
+        return window
+
+    @staticmethod
+    def _version_query(conversation_id: int, user_id: int):
+        last_message_id = select(func.max(Message.id)).where(Message.conversation_id == Conversation.id).scalar_subquery()
+        return select(Conversation.title, Conversation.model, Conversation.summary_message_id, func.coalesce(last_message_id, 0)).where(
+            Conversation.id == conversation_id, Conversation.user_id == user_id
+        )
+
+    def _store(self, window: ConversationWindow) -> None:
+        if not self.enabled:
+            return
+        self.invalidate(window.conversation.id)
+        self._windows[window.conversation.id] = window
+        self._bytes += window.measure()
+        self._evict()
+
+    def _resize(self, window: ConversationWindow) -> None:
+        self._bytes -= window.size_bytes
+        self._bytes += window.measure()
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._windows:
+            _, window = self._windows.popitem(last=False)
+            self._bytes -= window.size_bytes
+            self.evictions += 1
+
+    def append(self, conversation_id: int, messages: Iterable[Message], **changes: Any) -> None:
+        window = self._windows.get(conversation_id)
+        if window is None:
+            return
+        for message in messages:
+            window.messages.append(MessageSnapshot.from_model(message))
+        for key, value in changes.items():
+            setattr(window.conversation, key, value)
+        self._resize(window)
+
+    def update(self, conversation_id: int, **changes: Any) -> None:
+        window = self._windows.get(conversation_id)
+        if window is None:
+            return
+        for key, value in changes.items():
+            setattr(window.conversation, key, value)
+        if "summary_message_id" in changes:
+            cutoff = changes["summary_message_id"]
+            window.messages = deque((m for m in window.messages if m.id > cutoff), maxlen=self.max_messages)
+        self._resize(window)
+
+    def invalidate(self, conversation_id: int) -> None:
+        window = self._windows.pop(conversation_id, None)
+        if window is not None:
+            self._bytes -= window.size_bytes
+
+    def clear(self) -> None:
+        self._windows.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "windows": len(self._windows),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "evictions": self.evictions,
+        }
+
+
+def _build_cache() -> ConversationWindowCache:
+    settings = get_settings()
+    max_bytes = settings.conversation_cache_max_bytes if settings.conversation_cache_enabled else 0
+    return ConversationWindowCache(max_bytes=max_bytes, max_messages=settings.context_max_messages, ttl_seconds=settings.conversation_cache_ttl_seconds)
+
+
+conversation_windows = _build_cache()
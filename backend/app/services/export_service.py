@@ -0,0 +1,69 @@
+import json
+import zlib
+from collections.abc import AsyncIterator, Sequence
+from datetime import date, datetime
+from typing import Any
+
+from sqlalchemy import select
+
+from app.db.session import ReadSessionLocal
+from app.models.chat import Conversation, Message
+
+CONVERSATION_FIELDS = ("id", "title", "model", "system_prompt", "summary", "created_at", "updated_at")
+MESSAGE_FIELDS = ("id", "role", "content", "prompt_tokens", "completion_tokens", "total_tokens", "cached", "created_at")
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+GZIP_LEVEL = 6
+
+
+def _isoformat(value: Any) -> str:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_isoformat).encode
+
+
+def _line(kind: str, fields: tuple[str, ...], row: Sequence[Any], **extra: Any) -> str:
+    return _encode({"type": kind, **extra, **dict(zip(fields, row))}) + "\n"
+
+
+async def export_ndjson(user_id: int, conversation_id: int | None = None, batch_size: int = 1000) -> AsyncIterator[bytes]:
+    """Yield the user's conversations as NDJSON, one chunk per fetched batch.
+
+    Each conversation line is followed by its messages in chronological order. Messages are read through a
+    server-side cursor and conversations a batch at a time, so memory stays flat however large the history.
+    """
+    # The export outlives the request, so it reads through its own session rather than the request's.
+    async with ReadSessionLocal() as db:
+        last_id = 0
+        while True:
+            statement = select(*(getattr(Conversation, name) for name in CONVERSATION_FIELDS)).where(
+                Conversation.user_id == user_id, Conversation.id > last_id
+            )
+            if conversation_id is not None:
+                statement = statement.where(Conversation.id == conversation_id)
+            conversations = (await db.execute(statement.order_by(Conversation.id).limit(batch_size))).all()
+            if not conversations:
+                return
+            for conversation in conversations:
+                yield _line("conversation", CONVERSATION_FIELDS, conversation).encode()
+                result = await db.stream(
+                    select(*(getattr(Message, name) for name in MESSAGE_FIELDS))
+                    .where(Message.conversation_id == conversation.id)
+                    .order_by(Message.created_at.asc(), Message.id.asc())
+                    .execution_options(yield_per=batch_size)
+                )
+                async for rows in result.partitions():
+                    yield "".join(_line("message", MESSAGE_FIELDS, row, conversation_id=conversation.id) for row in rows).encode()
+            last_id = conversations[-1].id
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes], level: int = GZIP_LEVEL) -> AsyncIterator[bytes]:
+    """Compress a byte stream into a single gzip member without buffering it."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
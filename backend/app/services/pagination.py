@@ -0,0 +1,105 @@
+import base64
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from fastapi import HTTPException
+from sqlalchemy import String, literal, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+from sqlalchemy.sql import Select
+
+BEFORE_HEADER = "X-Before-Cursor"
+AFTER_HEADER = "X-After-Cursor"
+
+
+@dataclass(slots=True)
+class Page:
+    items: list[Any]
+    before: str | None = None
+    after: str | None = None
+
+    def headers(self) -> dict[str, str]:
+        headers = {}
+        if self.before:
+            headers[BEFORE_HEADER] = self.before
+        if self.after:
+            headers[AFTER_HEADER] = self.after
+        return headers
+
+
+def encode_cursor(moment: datetime, row_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{moment.isoformat()}|{row_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        moment, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(moment), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor") from None
+
+
+def _bound(moment: datetime, dialect: str) -> Any:
+    if dialect != "sqlite":
+        return moment
+    # SQLite compares timestamps as text, and CURRENT_TIMESTAMP defaults are stored without fractions.
+    # Bind the cursor in the same shape as the stored value so equal timestamps compare equal.
+    text = moment.strftime("%Y-%m-%d %H:%M:%S")
+    if moment.microsecond:
+        text += f".{moment.microsecond:06d}"
+    return literal(text, String)
+
+
+async def keyset_page(
+    db: AsyncSession,
+    statement: Select,
+    moment_column: InstrumentedAttribute,
+    id_column: InstrumentedAttribute,
+    limit: int,
+    before: str | None = None,
+    after: str | None = None,
+    newest_first: bool = True,
+) -> Page:
+    """Page ``statement`` on ``(moment_column, id_column)``.
+
+    Without a cursor the page holds the newest ``limit`` rows. ``before`` walks towards older rows and
+    ``after`` towards newer ones. Rows come back newest first, or oldest first with ``newest_first=False``.
+    """
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+    key = tuple_(moment_column, id_column)
+    dialect = db.get_bind().dialect.name
+    going_back = after is None
+    if before:
+        moment, row_id = decode_cursor(before)
+        statement = statement.where(key < tuple_(_bound(moment, dialect), row_id))
+    elif after:
+        moment, row_id = decode_cursor(after)
+        statement = statement.where(key > tuple_(_bound(moment, dialect), row_id))
+    if going_back:
+        statement = statement.order_by(moment_column.desc(), id_column.desc())
+    else:
+        statement = statement.order_by(moment_column.asc(), id_column.asc())
+
+    rows: Sequence[Any] = (await db.execute(statement.limit(limit + 1))).all()
+    more = len(rows) > limit
+    rows = list(rows[:limit])
+
+    def cursor(row: Any) -> str:
+        return encode_cursor(getattr(row, moment_column.key), getattr(row, id_column.key))
+
+    page = Page(items=rows)
+    if rows:
+        if going_back:
+            page.before = cursor(rows[-1]) if more else None
+            page.after = cursor(rows[0]) if before else None
+        else:
+            page.after = cursor(rows[-1]) if more else None
+            page.before = cursor(rows[0])
+    # Rows were fetched walking away from the cursor; put them in presentation order.
+    if going_back != newest_first:
+        page.items.reverse()
+    return page
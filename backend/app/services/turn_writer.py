@@ -0,0 +1,187 @@
+import asyncio
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.db.session import AsyncSessionLocal
+from app.models.chat import Conversation, Message
+from app.services.conversation_cache import conversation_windows
+from app.services.usage_ingest import UsageRecord, usage_ingestor
+
+logger = logging.getLogger("nova-bot.persistence")
+
+
+@dataclass
+class PendingTurn:
+    """A finished assistant turn whose rows have not been committed yet."""
+
+    user_id: int
+    conversation_id: int
+    message: Message
+    usage: UsageRecord
+    changes: dict[str, Any] = field(default_factory=dict)
+    on_commit: Callable[[], None] | None = None
+    done: asyncio.Future | None = None
+
+
+class TurnWriter:
+    """Write-behind queue for streamed turns: callers enqueue and move on, a worker commits in batches."""
+
+    def __init__(self, max_queue: int, max_batch: int) -> None:
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self._queue: asyncio.Queue[PendingTurn] | None = None
+        self._worker: asyncio.Task | None = None
+        self._pending: dict[int, list[asyncio.Future]] = {}
+        # Owner of each conversation in _pending, so a user's whole backlog can be awaited.
+        self._owners: dict[int, int] = {}
+        self._closing = False
+        self.enqueued = 0
+        self.committed = 0
+        self.dropped = 0
+        self.batches = 0
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _ensure_worker(self) -> asyncio.Queue[PendingTurn]:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        return self._queue
+
+    async def submit(self, turn: PendingTurn) -> None:
+        """Queue a turn for commit; waits only when the queue is full."""
+        if self._closing:
+            await self._write_batch([turn])
+            return
+        queue = self._ensure_worker()
+        turn.done = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(turn.conversation_id, []).append(turn.done)
+        self._owners[turn.conversation_id] = turn.user_id
+        self.enqueued += 1
+        await queue.put(turn)
+
+    async def wait(self, conversation_id: int) -> None:
+        """Block until every turn already queued for the conversation has been written."""
+        futures = self._pending.get(conversation_id)
+        if futures:
+            await asyncio.gather(*futures, return_exceptions=True)
+
+    async def wait_user(self, user_id: int) -> None:
+        """Block until every turn already queued for any of the user's conversations has been written."""
+        futures = [future for conversation_id, owner in self._owners.items() if owner == user_id for future in self._pending.get(conversation_id, ())]
+        if futures:
+            await asyncio.gather(*futures, return_exceptions=True)
+
+    async def _run(self) -> None:
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.max_batch and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                await self._write_batch(batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    async def _write_batch(self, batch: list[PendingTurn]) -> None:
+        try:
+            async with AsyncSessionLocal() as db:
+                written = [turn for turn in batch if await self._stage(db, turn)]
+                await db.commit()
+        except Exception as exc:
+            if len(batch) == 1:
+                logger.error("Dropping turn for conversation %s: %s", batch[0].conversation_id, exc)
+                self.dropped += 1
+                await self._settle(batch[0], written=False)
+                return
+            # Isolate the bad turn instead of losing the whole batch.
+            logger.warning("Batch write of %s turns failed, retrying one by one: %s", len(batch), exc)
+            for turn in batch:
+                await self._write_batch([turn])
+            return
+
+        self.batches += 1
+        self.committed += len(written)
+        self.dropped += len(batch) - len(written)
+        for turn in batch:
+            await self._settle(turn, written=turn in written)
+
+    async def _settle(self, turn: PendingTurn, written: bool) -> None:
+        # Runs after the commit. A failing callback is logged; it must not kill the worker or leave wait() hanging.
+        try:
+            if written:
+                conversation_windows.append(turn.conversation_id, [turn.message], **turn.changes)
+                if turn.on_commit is not None:
+                    turn.on_commit()
+            await self._record_usage(turn, written)
+        except Exception:
+            logger.exception("Post-commit step failed for conversation %s", turn.conversation_id)
+        finally:
+            self._finish(turn)
+
+    async def _record_usage(self, turn: PendingTurn, written: bool) -> None:
+        # Tokens were spent either way; only the link to a vanished conversation is dropped.
+        if not written:
+            turn.usage.conversation_id = None
+        await usage_ingestor.submit(turn.usage)
+
+    async def _stage(self, db: AsyncSession, turn: PendingTurn) -> bool:
+        updated = await db.execute(update(Conversation).where(Conversation.id == turn.conversation_id, Conversation.user_id == turn.user_id).values(**turn.changes))
+        if updated.rowcount == 0:
+            # The conversation was deleted while the turn was queued.
+            return False
+        db.add(turn.message)
+        return True
+
+    def _finish(self, turn: PendingTurn) -> None:
+        if turn.done is None:
+            return
+        if not turn.done.done():
+            turn.done.set_result(None)
+        futures = self._pending.get(turn.conversation_id)
+        if futures is not None:
+            futures.remove(turn.done)
+            if not futures:
+                del self._pending[turn.conversation_id]
+                self._owners.pop(turn.conversation_id, None)
+
+    async def close(self) -> None:
+        """Drain everything still queued; called on graceful shutdown."""
+        self._closing = True
+        if self._queue is not None:
+            await self._queue.join()
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        self._queue = None
+        self._closing = False
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "enqueued": self.enqueued,
+            "committed": self.committed,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "avg_batch": round(self.committed / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+def _build_writer() -> TurnWriter:
+    settings = get_settings()
+    return TurnWriter(max_queue=settings.persistence_max_queue, max_batch=settings.persistence_max_batch)
+
+
+turn_writer = _build_writer()
@@ -0,0 +1,233 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any
+
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.llm_client import LLMClient
+from app.db.session import AsyncSessionLocal, engine
+from app.models.usage import UsageDaily, UsageLog
+
+logger = logging.getLogger("nova-bot.usage")
+
+COPY_COLUMNS = (
+    "user_id",
+    "conversation_id",
+    "model",
+    "prompt_tokens",
+    "completion_tokens",
+    "total_tokens",
+    "estimated_cost_usd",
+    "cached",
+    "created_at",
+    "updated_at",
+)
+ROLLUP_COUNTERS = ("requests", "prompt_tokens", "completion_tokens", "total_tokens", "estimated_cost_usd")
+ROLLUP_CHUNK = 500
+
+
+@dataclass(slots=True)
+class UsageRecord:
+    user_id: int
+    conversation_id: int | None
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    cached: bool = False
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+    def row(self, cost: Decimal) -> tuple[Any, ...]:
+        return (
+            self.user_id,
+            self.conversation_id,
+            self.model,
+            self.prompt_tokens,
+            self.completion_tokens,
+            self.total_tokens,
+            cost,
+            self.cached,
+            self.created_at,
+            self.created_at,
+        )
+
+
+class UsageIngestor:
+    """Buffers usage records and writes them in bulk when ``flush_rows`` pile up or every ``flush_interval`` seconds.
+
+    At most ``max_buffered`` rows are held in memory, which bounds what a crash can lose; past that,
+    producers wait for a flush. Costs are priced once per batch rather than on the request path.
+    """
+
+    def __init__(self, flush_rows: int, flush_interval: float, max_buffered: int, use_copy: bool) -> None:
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.max_buffered = max(max_buffered, flush_rows)
+        self.use_copy = use_copy and engine.dialect.driver == "asyncpg"
+        self._buffer: list[UsageRecord] = []
+        self._users: set[int] = set()
+        self._lock = asyncio.Lock()
+        self._wake: asyncio.Event | None = None
+        self._worker: asyncio.Task | None = None
+        self._stopping = False
+        self.flushed_rows = 0
+        self.flushes = 0
+        self.failures = 0
+        self.lost_rows = 0
+
+    def _ensure_worker(self) -> None:
+        if self._wake is None:
+            self._wake = asyncio.Event()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def submit(self, record: UsageRecord) -> None:
+        self._ensure_worker()
+        self._buffer.append(record)
+        self._users.add(record.user_id)
+        if len(self._buffer) >= self.max_buffered:
+            await self.flush()
+        elif len(self._buffer) >= self.flush_rows:
+            self._wake.set()
+
+    def has_pending(self, user_id: int) -> bool:
+        return user_id in self._users
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self._buffer:
+                return
+            batch, self._buffer, self._users = self._buffer, [], set()
+            lost = self.lost_rows
+            try:
+                await self._write(batch)
+                unwritten = []
+            except Exception as exc:
+                self.failures += 1
+                # Isolate a bad row instead of retrying the whole batch forever.
+                logger.warning("Usage flush of %s rows failed, retrying one by one: %s", len(batch), exc)
+                unwritten = await self._write_each(batch)
+            written = len(batch) - len(unwritten) - (self.lost_rows - lost)
+            if written:
+                self.flushes += 1
+                self.flushed_rows += written
+            if unwritten:
+                # Keep the rows for the next flush, but never hold more than max_buffered.
+                self._buffer = unwritten + self._buffer
+                overflow = len(self._buffer) - self.max_buffered
+                if overflow > 0:
+                    self.lost_rows += overflow
+                    logger.error("Dropping %s usage rows after repeated flush failures", overflow)
+                    del self._buffer[:overflow]
+                self._users = {record.user_id for record in self._buffer}
+
+    async def _write_each(self, batch: list[UsageRecord]) -> list[UsageRecord]:
+        """Write the rows of a failed batch one at a time; returns the rows left for the next flush.
+
+        A row rejected by a constraint is fixed up or dropped. Any other error means the database
+        itself is failing, so the rest of the batch waits for the next flush.
+        """
+        for index, record in enumerate(batch):
+            try:
+                await self._write([record])
+            except IntegrityError as exc:
+                if record.conversation_id is not None:
+                    # The conversation was deleted before the flush; tokens were spent, so keep the row without the link.
+                    record.conversation_id = None
+                    try:
+                        await self._write([record])
+                        continue
+                    except IntegrityError as retry_exc:
+                        exc = retry_exc
+                    except Exception:
+                        return batch[index:]
+                self.lost_rows += 1
+                logger.error("Dropping usage row for user %s: %s", record.user_id, exc)
+            except Exception:
+                return batch[index:]
+        return []
+
+    async def _write(self, batch: list[UsageRecord]) -> None:
+        rows = [record.row(Decimal("0.0000") if record.cached else LLMClient.estimate_cost(record.model, record.total_tokens)) for record in batch]
+        async with AsyncSessionLocal() as db:
+            # Single rows go through insert(), whose errors SQLAlchemy wraps; COPY's come straight from asyncpg.
+            if self.use_copy and len(rows) > 1:
+                connection = await db.connection()
+                raw = await connection.get_raw_connection()
+                await raw.driver_connection.copy_records_to_table(UsageLog.__tablename__, records=rows, columns=COPY_COLUMNS)
+            else:
+                # executemany over insert() is rendered as multi-row INSERT ... VALUES batches.
+                await db.execute(insert(UsageLog), [dict(zip(COPY_COLUMNS, row)) for row in rows])
+            await self._rollup(db, batch, rows)
+            await db.commit()
+
+    async def _rollup(self, db: AsyncSession, batch: list[UsageRecord], rows: list[tuple[Any, ...]]) -> None:
+        # Fold the batch into usage_daily in the same transaction, so the rollup never drifts from the log.
+        totals: dict[tuple[int, Any, str], list] = {}
+        for record, row in zip(batch, rows):
+            counters = totals.setdefault((record.user_id, record.created_at.date(), record.model), [0, 0, 0, 0, Decimal("0")])
+            counters[0] += 1
+            counters[1] += record.prompt_tokens
+            counters[2] += record.completion_tokens
+            counters[3] += record.total_tokens
+            counters[4] += row[6]
+        # Sorted keys keep row-lock order consistent between concurrent writers on Postgres.
+        values = [{"user_id": key[0], "day": key[1], "model": key[2], **dict(zip(ROLLUP_COUNTERS, counters))} for key, counters in sorted(totals.items())]
+        upsert = postgresql.insert if engine.dialect.name == "postgresql" else sqlite.insert
+        for start in range(0, len(values), ROLLUP_CHUNK):
+            statement = upsert(UsageDaily).values(values[start : start + ROLLUP_CHUNK])
+            statement = statement.on_conflict_do_update(
+                index_elements=[UsageDaily.user_id, UsageDaily.day, UsageDaily.model],
+                set_={name: getattr(UsageDaily, name) + statement.excluded[name] for name in ROLLUP_COUNTERS},
+            )
+            await db.execute(statement)
+
+    async def close(self) -> None:
+        if self._worker is not None:
+            # Let the worker finish its current write and exit rather than cancelling it mid-flush.
+            self._stopping = True
+            self._wake.set()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+            self._stopping = False
+        await self.flush()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "buffered": len(self._buffer),
+            "max_buffered": self.max_buffered,
+            "mode": "copy" if self.use_copy else "insert",
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "failures": self.failures,
+            "lost_rows": self.lost_rows,
+        }
+
+
+def _build_ingestor() -> UsageIngestor:
+    settings = get_settings()
+    return UsageIngestor(
+        flush_rows=settings.usage_flush_rows,
+        flush_interval=settings.usage_flush_interval_seconds,
+        max_buffered=settings.usage_max_buffered_rows,
+        use_copy=settings.usage_copy_enabled,
+    )
+
+
+usage_ingestor = _build_ingestor()
@@ -0,0 +1,89 @@
+"""Tail latency with and without hedged LLM requests, against the local fake provider.
+
+Usage (from backend/): python -m benchmarks.bench_hedging --requests 400 --tail-ratio 0.05 --tail-delay 2
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from contextlib import aclosing
+
+from benchmarks.fake_provider import FakeProvider, FakeProviderConfig, FakeProviderServer
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run(llm_client, requests: int, concurrency: int, model: str, stream: bool, hedge: bool) -> tuple[list[float], int]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def one(index: int) -> None:
+        nonlocal errors
+        messages = [{"role": "user", "content": f"request {index} hedge={hedge} stream={stream}"}]
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                if stream:
+                    async with aclosing(llm_client.stream(messages, model=model, max_tokens=64, hedge=hedge)) as chunks:
+                        async for chunk in chunks:
+                            if chunk.content:
+                                # Time to first token is what a user perceives on the streaming path.
+                                latencies.append(time.perf_counter() - started)
+                                break
+                else:
+                    await llm_client.complete(messages, model=model, max_tokens=64, hedge=hedge)
+                    latencies.append(time.perf_counter() - started)
+            except Exception:
+                errors += 1
+
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return latencies, errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--ttft", type=float, default=0.1)
+    parser.add_argument("--tail-ratio", type=float, default=0.05)
+    parser.add_argument("--tail-delay", type=float, default=2.0)
+    parser.add_argument("--port", type=int, default=9101)
+    parser.add_argument("--stream", action="store_true", help="measure time to first token instead of full completions")
+    args = parser.parse_args()
+
+    config = FakeProviderConfig(ttft=args.ttft, tail_ratio=args.tail_ratio, tail_delay=args.tail_delay, reply_tokens=8, tokens_per_second=0, seed=11)
+    provider = FakeProvider(config)
+    with FakeProviderServer(provider, port=args.port) as server:
+        os.environ.update(
+            OPENAI_API_KEY="fake",
+            GEMINI_API_KEY="fake",
+            OPENAI_BASE_URL=f"{server.url}/v1",
+            GEMINI_BASE_URL=f"{server.url}/v1beta",
+            LLM_HEDGE_MIN_DELAY="0.05",
+        )
+        from app.core.llm_client import LLMClient
+
+        llm_client = LLMClient()
+
+        async def bench() -> None:
+            print(f"{args.requests} {'streams' if args.stream else 'completions'} on {args.model}, {args.tail_ratio:.0%} stall for {args.tail_delay}s")
+            print(f"{'mode':<8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'upstream':>9} {'errors':>7}")
+            for hedge in (False, True):
+                before = provider.requests
+                latencies, errors = await run(llm_client, args.requests, args.concurrency, args.model, args.stream, hedge)
+                upstream = provider.requests - before
+                row = [statistics.median(latencies), percentile(latencies, 0.95), percentile(latencies, 0.99), max(latencies)]
+                print(f"{'hedged' if hedge else 'plain':<8} " + " ".join(f"{value * 1000:>8.0f}" for value in row) + f" {upstream:>9} {errors:>7}")
+
+        asyncio.run(bench())
+
+
+if __name__ == "__main__":
+    main()
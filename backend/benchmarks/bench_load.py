@@ -0,0 +1,257 @@
+"""End-to-end load test: replay a scripted multi-user chat workload against the backend and a fake provider.
+
+Starts the fake provider (configurable first-token delay, token rate, stalls and 503s) and one
+backend worker as subprocesses on a fresh database. Each simulated user then opens a conversation
+and runs the workload script against it, with concurrent users. A workload is a JSON file with
+"users", "iterations", "think_time_ms" and a "script" of steps; see benchmarks/workloads/. Any
+other file is read as chat payloads, either one JSON object such as stream_payload.json or JSON
+lines, and each payload is replayed as a step. "endpoint" defaults to "stream", and
+conversation_id is replaced by the user's own conversation.
+
+It reports throughput, and p50/p95/p99 time to first token and total latency for each step kind.
+It also reports the database queries and provider calls the backend made during the run, taken
+as the difference in its /metrics counters before and after. No provider keys are needed.
+
+Usage (from backend/): python -m benchmarks.bench_load --workload benchmarks/workloads/mixed_chat.json
+                       python -m benchmarks.bench_load --workload ../stream_payload.json --users 100
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from benchmarks.fake_provider import FakeProviderConfig
+from benchmarks.harness import BenchStack, backend_env, percentile, seed_users
+
+ENDPOINTS = ("stream", "send", "history", "list")
+DONE_LINE = 'data: {"type":"done"}'
+TOKEN_PREFIX = 'data: {"type":"token"'
+STATEMENT_LABEL = re.compile(r'statement="([^"]*)"')
+
+
+class StepFailed(Exception):
+    pass
+
+
+@dataclass
+class Workload:
+    name: str
+    users: int
+    iterations: int
+    think_time_ms: tuple[float, float]
+    script: list[dict[str, Any]]
+
+    @classmethod
+    def load(cls, path: Path) -> "Workload":
+        text = path.read_text()
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            data = [json.loads(line) for line in text.splitlines() if line.strip()]
+        if isinstance(data, dict) and "script" in data:
+            options, script = data, data["script"]
+        else:
+            options, script = {}, data if isinstance(data, list) else [data]
+        for step in script:
+            step.setdefault("endpoint", "stream")
+            if step["endpoint"] not in ENDPOINTS:
+                raise ValueError(f"Unknown endpoint {step['endpoint']!r} in {path}; expected one of {ENDPOINTS}")
+        low, high = options.get("think_time_ms", (0, 0))
+        return cls(options.get("name", path.stem), options.get("users", 10), options.get("iterations", 1), (low, high), script)
+
+
+@dataclass
+class StepStats:
+    ok: int = 0
+    failed: int = 0
+    ttft: list[float] = field(default_factory=list)
+    total: list[float] = field(default_factory=list)
+    errors: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+
+class Replayer:
+    def __init__(self, client: httpx.AsyncClient, workload: Workload, vary: bool) -> None:
+        self.client = client
+        self.workload = workload
+        self.vary = vary
+        self.stats: dict[str, StepStats] = defaultdict(StepStats)
+
+    def payload(self, step: dict[str, Any], conversation_id: int, user: int, iteration: int) -> dict[str, Any]:
+        body = {key: value for key, value in step.items() if key != "endpoint"}
+        body["conversation_id"] = conversation_id
+        if self.vary:
+            # Identical concurrent prompts at a low temperature would be coalesced into one provider call; keep users distinct.
+            body["message"] = f"{body.get('message', 'hello')} [user {user}, pass {iteration}]"
+        return body
+
+    async def stream(self, headers: dict[str, str], body: dict[str, Any], stats: StepStats) -> None:
+        started = time.perf_counter()
+        first = None
+        done = False
+        async with self.client.stream("POST", "/api/chat/send/stream", json=body, headers=headers) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise StepFailed(f"HTTP {response.status_code}")
+            async for line in response.aiter_lines():
+                if first is None and line.startswith(TOKEN_PREFIX):
+                    first = time.perf_counter() - started
+                elif line == DONE_LINE:
+                    done = True
+        if not done:
+            raise StepFailed("error frame")
+        stats.ttft.append(first if first is not None else time.perf_counter() - started)
+        stats.total.append(time.perf_counter() - started)
+
+    async def request(self, method: str, url: str, headers: dict[str, str], stats: StepStats, body: dict[str, Any] | None = None) -> None:
+        started = time.perf_counter()
+        response = await self.client.request(method, url, json=body, headers=headers)
+        if response.status_code != 200:
+            raise StepFailed(f"HTTP {response.status_code}")
+        elapsed = time.perf_counter() - started
+        # A non-streamed reply arrives all at once, so its first token is its last.
+        stats.ttft.append(elapsed)
+        stats.total.append(elapsed)
+
+    async def user(self, index: int, token: str) -> None:
+        headers = {"Authorization": f"Bearer {token}"}
+        created = await self.client.post("/api/chat/new", json={"title": f"Load test {index}"}, headers=headers)
+        if created.status_code != 200:
+            self.stats["create"].failed += 1
+            return
+        self.stats["create"].ok += 1
+        conversation_id = created.json()["id"]
+        low, high = self.workload.think_time_ms
+
+        for iteration in range(self.workload.iterations):
+            for step in self.workload.script:
+                kind = step["endpoint"]
+                stats = self.stats[kind]
+                try:
+                    if kind == "stream":
+                        await self.stream(headers, self.payload(step, conversation_id, index, iteration), stats)
+                    elif kind == "send":
+                        await self.request("POST", "/api/chat/send", headers, stats, self.payload(step, conversation_id, index, iteration))
+                    elif kind == "history":
+                        await self.request("GET", f"/api/chat/history/{conversation_id}", headers, stats)
+                    else:
+                        await self.request("GET", "/api/chat/list", headers, stats)
+                    stats.ok += 1
+                except (StepFailed, httpx.HTTPError) as exc:
+                    stats.failed += 1
+                    stats.errors[str(exc) or type(exc).__name__] += 1
+                if high:
+                    await asyncio.sleep(random.uniform(low, high) / 1000)
+
+
+def counters(metrics: str, name: str) -> dict[str, float]:
+    values: dict[str, float] = {}
+    for line in metrics.splitlines():
+        if line.startswith(name + "{") or line.startswith(name + " "):
+            labels, value = line[len(name) :].rsplit(" ", 1)
+            values[labels] = float(value)
+    return values
+
+
+def difference(before: str, after: str, name: str) -> dict[str, float]:
+    start = counters(before, name)
+    return {labels: value - start.get(labels, 0.0) for labels, value in counters(after, name).items()}
+
+
+async def run(base_url: str, tokens: list[str], workload: Workload, vary: bool) -> tuple[Replayer, float, str, str]:
+    limits = httpx.Limits(max_connections=len(tokens) * 2, max_keepalive_connections=len(tokens) * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        before = (await client.get("/metrics")).text
+        replayer = Replayer(client, workload, vary)
+        started = time.perf_counter()
+        await asyncio.gather(*(replayer.user(index, token) for index, token in enumerate(tokens, start=1)))
+        elapsed = time.perf_counter() - started
+        after = (await client.get("/metrics")).text
+    return replayer, elapsed, before, after
+
+
+def report(workload: Workload, replayer: Replayer, elapsed: float, before: str, after: str) -> None:
+    def ms(values: list[float], q: float) -> str:
+        return f"{percentile(values, q) * 1000:.0f}" if values else "-"
+
+    steps = sum(stats.ok for kind, stats in replayer.stats.items() if kind != "create")
+    turns = sum(stats.ok for kind, stats in replayer.stats.items() if kind in ("stream", "send"))
+    print(f"\n{workload.name}: {workload.users} users x {workload.iterations} passes x {len(workload.script)} steps in {elapsed:.1f}s")
+    print(f"throughput: {steps / elapsed:.1f} steps/s, {turns / elapsed:.1f} chat turns/s")
+    print(f"{'step':<8} {'ok':>6} {'failed':>7} {'ttft p50':>9} {'p95':>7} {'p99':>7} {'total p50':>10} {'p95':>7} {'p99':>7}  (ms)")
+    for kind in ENDPOINTS:
+        stats = replayer.stats.get(kind)
+        if stats is None:
+            continue
+        print(
+            f"{kind:<8} {stats.ok:>6} {stats.failed:>7} {ms(stats.ttft, 0.5):>9} {ms(stats.ttft, 0.95):>7} {ms(stats.ttft, 0.99):>7} "
+            f"{ms(stats.total, 0.5):>10} {ms(stats.total, 0.95):>7} {ms(stats.total, 0.99):>7}"
+        )
+        for error, count in sorted(stats.errors.items(), key=lambda item: -item[1]):
+            print(f"{'':<8} {count:>6} x {error}")
+
+    queries: dict[str, float] = defaultdict(float)
+    for labels, count in difference(before, after, "nova_db_query_duration_seconds_count").items():
+        match = STATEMENT_LABEL.search(labels)
+        queries[match.group(1) if match else "OTHER"] += count
+    total_queries = sum(queries.values())
+    requests = sum(stats.ok + stats.failed for stats in replayer.stats.values())
+    provider_calls = sum(difference(before, after, "nova_provider_request_duration_seconds_count").values())
+    provider_errors = sum(difference(before, after, "nova_provider_errors_total").values())
+    breakdown = ", ".join(f"{verb} {count:.0f}" for verb, count in sorted(queries.items(), key=lambda item: -item[1]) if count)
+    print(f"db queries: {total_queries:.0f} ({total_queries / max(requests, 1):.1f} per request; {breakdown})")
+    print(f"provider calls: {provider_calls:.0f}, provider errors: {provider_errors:.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workload", type=Path, default=Path(__file__).parent / "workloads" / "mixed_chat.json")
+    parser.add_argument("--users", type=int, help="override the workload's user count")
+    parser.add_argument("--iterations", type=int, help="override how many times each user runs the script")
+    parser.add_argument("--verbatim", action="store_true", help="send messages exactly as scripted, so identical prompts up to LLM_COALESCE_MAX_TEMPERATURE may coalesce")
+    parser.add_argument("--database-url", help="async URL of an empty database to run against (default: a fresh SQLite file)")
+    parser.add_argument("--ttft", type=float, default=0.2, help="fake provider delay before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=100.0)
+    parser.add_argument("--reply-tokens", type=int, default=60)
+    parser.add_argument("--tail-ratio", type=float, default=0.0, help="fraction of provider calls that stall")
+    parser.add_argument("--tail-delay", type=float, default=3.0)
+    parser.add_argument("--error-ratio", type=float, default=0.0, help="fraction of provider calls answered with a 503")
+    parser.add_argument("--port", type=int, default=9107)
+    parser.add_argument("--provider-port", type=int, default=9108)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra backend setting, e.g. --env STREAM_COALESCE_MS=0")
+    args = parser.parse_args()
+
+    workload = Workload.load(args.workload)
+    workload.users = args.users or workload.users
+    workload.iterations = args.iterations or workload.iterations
+
+    workdir = tempfile.mkdtemp(prefix="nova_load_")
+    database_url = args.database_url or f"sqlite+aiosqlite:///{os.path.join(workdir, 'nova.db')}"
+    tokens = seed_users(database_url, workload.users)
+    provider = FakeProviderConfig(
+        ttft=args.ttft,
+        tail_ratio=args.tail_ratio,
+        tail_delay=args.tail_delay,
+        tokens_per_second=args.tokens_per_second,
+        reply_tokens=args.reply_tokens,
+        error_ratio=args.error_ratio,
+    )
+    overrides = dict(item.split("=", 1) for item in args.env)
+    env = backend_env(database_url, f"http://127.0.0.1:{args.provider_port}", workload.users, METRICS_ENABLED="true", **overrides)
+    with BenchStack(env, provider, args.port, args.provider_port, workdir=workdir) as stack:
+        replayer, elapsed, before, after = asyncio.run(run(stack.url, tokens, workload, vary=not args.verbatim))
+    report(workload, replayer, elapsed, before, after)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Stream token gaps while a burst of logins hashes passwords, with bcrypt inline vs. on the hashing pool.
+
+Runs the real app under uvicorn (SQLite, fake provider) and keeps --streams SSE responses open while
+--logins logins arrive --login-concurrency at a time. Inline mode patches the pool out, reproducing
+the old behaviour where each bcrypt call blocked the event loop.
+
+Usage (from backend/): python -m benchmarks.bench_login_stream --streams 8 --logins 40
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+import httpx
+import uvicorn
+
+from benchmarks.fake_provider import FakeProvider, FakeProviderConfig, FakeProviderServer
+
+PASSWORD = "benchmark-password"
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def stream_gaps(client: httpx.AsyncClient, token: str, conversation_id: int) -> list[float] | None:
+    gaps: list[float] = []
+    last = None
+    payload = {"conversation_id": conversation_id, "message": "tell me a long story"}
+    async with client.stream("POST", "/api/chat/send/stream", json=payload, headers={"Authorization": f"Bearer {token}"}) as response:
+        if response.status_code != 200:
+            return None
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            now = time.perf_counter()
+            if last is not None:
+                gaps.append(now - last)
+            last = now
+    return gaps
+
+
+async def login_burst(client: httpx.AsyncClient, users: int, logins: int, concurrency: int) -> tuple[list[float], int]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    failures = 0
+
+    async def one(index: int) -> None:
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post("/api/auth/login", json={"email": f"user{index % users}@bench.dev", "password": PASSWORD})
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                failures += 1
+
+    await asyncio.gather(*(one(i) for i in range(logins)))
+    return latencies, failures
+
+
+async def scenario(base_url: str, tokens: list[str], conversations: list[int], users: int, logins: int, concurrency: int) -> dict[str, float]:
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        streams = [asyncio.create_task(stream_gaps(client, token, conversation)) for token, conversation in zip(tokens, conversations)]
+        await asyncio.sleep(0.3)  # let the streams start producing tokens before the burst
+        started = time.perf_counter()
+        login_latencies, failures = await login_burst(client, users, logins, concurrency)
+        burst = time.perf_counter() - started
+        results = await asyncio.gather(*streams)
+    gaps = [gap for result in results if result for gap in result]
+    return {
+        "gap_p50": statistics.median(gaps) * 1000 if gaps else 0.0,
+        "gap_p99": percentile(gaps, 0.99) * 1000 if gaps else 0.0,
+        "gap_max": max(gaps) * 1000 if gaps else 0.0,
+        "login_p50": statistics.median(login_latencies) * 1000 if login_latencies else 0.0,
+        "logins_per_s": len(login_latencies) / burst,
+        "login_failures": failures,
+        "stream_failures": sum(result is None for result in results),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--streams", type=int, default=8)
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--login-concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=2, help="PASSWORD_HASH_WORKERS for the pool run")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--reply-tokens", type=int, default=300)
+    parser.add_argument("--port", type=int, default=9102)
+    parser.add_argument("--provider-port", type=int, default=9103)
+    args = parser.parse_args()
+
+    database = os.path.join(tempfile.mkdtemp(), "nova_login_bench.db")
+    config = FakeProviderConfig(ttft=0.05, tokens_per_second=args.tokens_per_second, reply_tokens=args.reply_tokens, seed=3)
+    with FakeProviderServer(FakeProvider(config), port=args.provider_port) as provider:
+        os.environ.update(
+            DATABASE_URL=f"sqlite+aiosqlite:///{database}",
+            OPENAI_API_KEY="fake",
+            GEMINI_API_KEY="fake",
+            OPENAI_BASE_URL=f"{provider.url}/v1",
+            GEMINI_BASE_URL=f"{provider.url}/v1beta",
+            PROVIDER_WARMUP="false",
+            STREAM_COALESCE_MS="0",
+            RATE_LIMIT_PER_MINUTE="100000",
+            RATE_LIMIT_TOKENS_PER_MINUTE="100000000",
+            PASSWORD_HASH_WORKERS=str(args.workers),
+            PASSWORD_HASH_MAX_QUEUE=str(args.logins),
+            PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS="60",
+        )
+        from sqlalchemy import insert
+
+        import app.models  # noqa: F401  (registers every table on Base.metadata)
+        from app.core.security import create_access_token, get_password_hash, password_hasher
+        from app.db.base import Base
+        from app.db.session import engine
+        from app.main import app
+        from app.models.chat import Conversation
+        from app.models.user import User
+
+        logging.disable(logging.ERROR)  # request logs and the expected SQLite lock errors would drown the table
+        users = max(args.streams, 10)
+
+        async def seed() -> None:
+            hashed = get_password_hash(PASSWORD)
+            async with engine.begin() as connection:
+                await connection.run_sync(Base.metadata.create_all)
+                await connection.execute(insert(User), [{"id": i + 1, "email": f"user{i}@bench.dev", "hashed_password": hashed} for i in range(users)])
+                await connection.execute(
+                    insert(Conversation), [{"id": i + 1, "user_id": i + 1, "title": "Bench", "model": "gpt-4o-mini", "system_prompt": ""} for i in range(users)]
+                )
+            await engine.dispose()
+
+        asyncio.run(seed())
+        tokens = [create_access_token(str(i + 1)) for i in range(args.streams)]
+        conversations = list(range(1, args.streams + 1))
+
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.01)
+
+        pooled_run = password_hasher._run
+
+        async def inline_run(func, *func_args):
+            return func(*func_args)
+
+        print(f"{args.streams} streams at {args.tokens_per_second:.0f} tokens/s, {args.logins} logins ({args.login_concurrency} concurrent)")
+        print(f"{'mode':<8} {'gap p50 ms':>10} {'gap p99 ms':>10} {'gap max ms':>10} {'login p50 ms':>12} {'logins/s':>9} {'failed logins':>13} {'failed streams':>14}")
+        try:
+            for mode in ("inline", "pool"):
+                password_hasher._run = inline_run if mode == "inline" else pooled_run
+                result = asyncio.run(scenario(f"http://127.0.0.1:{args.port}", tokens, conversations, users, args.logins, args.login_concurrency))
+                print(
+                    f"{mode:<8} {result['gap_p50']:>10.1f} {result['gap_p99']:>10.1f} {result['gap_max']:>10.1f} {result['login_p50']:>12.0f} "
+                    f"{result['logins_per_s']:>9.1f} {result['login_failures']:>13} {result['stream_failures']:>14}"
+                )
+        finally:
+            password_hasher._run = pooled_run
+            server.should_exit = True
+            thread.join()
+
+
+if __name__ == "__main__":
+    main()
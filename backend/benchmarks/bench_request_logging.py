@@ -0,0 +1,166 @@
+"""Streaming throughput with the old @app.middleware("http") request logger vs. the ASGI middleware and log queue.
+
+Serves a bare FastAPI app under uvicorn with one of the two logging setups. --streams clients read
+SSE responses of --frames small frames each, while --pingers clients hit a JSON endpoint in a loop
+so there is steady access-log traffic. The log sink sleeps --sink-delay-ms per record, the way a
+slow stdout pipe or container log driver does. "legacy" writes it on the event loop; "asgi" hands it
+to the background writer thread.
+
+Usage (from backend/): python -m benchmarks.bench_request_logging --streams 50 --frames 2000
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from app.core.request_log import TEXT_FORMAT, LogShipper, RequestLogMiddleware
+
+FRAME = b'data: {"type":"token","value":"word "}\n\n'
+
+
+class SlowSink(logging.FileHandler):
+    def __init__(self, path: str, delay: float) -> None:
+        super().__init__(path)
+        self.delay = delay
+        self.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.delay:
+            time.sleep(self.delay)
+        super().emit(record)
+
+
+def build_app(mode: str, frames: int) -> FastAPI:
+    app = FastAPI()
+    logger = logging.getLogger("nova-bot")
+
+    if mode == "legacy":
+
+        @app.middleware("http")
+        async def request_logger(request: Request, call_next):
+            start = time.perf_counter()
+            response = await call_next(request)
+            duration_ms = round((time.perf_counter() - start) * 1000, 2)
+            logger.info("%s %s -> %s (%sms)", request.method, request.url.path, response.status_code, duration_ms)
+            return response
+
+    else:
+        app.add_middleware(RequestLogMiddleware)
+
+    @app.get("/stream")
+    async def stream():
+        async def frames_gen():
+            for _ in range(frames):
+                yield FRAME
+                await asyncio.sleep(0)
+
+        return StreamingResponse(frames_gen(), media_type="text/event-stream")
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+async def read_stream(client: httpx.AsyncClient) -> tuple[int, float]:
+    received = 0
+    started = time.perf_counter()
+    async with client.stream("GET", "/stream") as response:
+        async for chunk in response.aiter_raw():
+            received += chunk.count(b"\n\n")
+    return received, time.perf_counter() - started
+
+
+async def scenario(base_url: str, streams: int, pingers: int) -> dict[str, float]:
+    limits = httpx.Limits(max_connections=streams + pingers + 10)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        done = asyncio.Event()
+        pings = 0
+
+        async def pinger() -> None:
+            nonlocal pings
+            while not done.is_set():
+                await client.get("/ping")
+                pings += 1
+
+        ping_tasks = [asyncio.create_task(pinger()) for _ in range(pingers)]
+        started = time.perf_counter()
+        results = await asyncio.gather(*(read_stream(client) for _ in range(streams)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await asyncio.gather(*ping_tasks)
+
+    frames = sum(received for received, _ in results)
+    durations = sorted(duration for _, duration in results)
+    return {
+        "frames_per_s": frames / elapsed,
+        "stream_p50": statistics.median(durations),
+        "stream_p99": durations[int(0.99 * (len(durations) - 1))],
+        "pings_per_s": pings / elapsed,
+    }
+
+
+def run_mode(mode: str, args: argparse.Namespace, port: int) -> dict[str, float]:
+    sink = SlowSink(os.path.join(tempfile.mkdtemp(), f"{mode}.log"), args.sink_delay_ms / 1000)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(logging.INFO)
+    shipper = None
+    if mode == "legacy":
+        root.addHandler(sink)
+    else:
+        shipper = LogShipper(sink)
+        root.addHandler(shipper.handler)
+        shipper.start()
+
+    server = uvicorn.Server(uvicorn.Config(build_app(mode, args.frames), host="127.0.0.1", port=port, log_level="warning", access_log=False))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        result = asyncio.run(scenario(f"http://127.0.0.1:{port}", args.streams, args.pingers))
+    finally:
+        server.should_exit = True
+        thread.join()
+        if shipper is not None:
+            shipper.stop()
+        root.removeHandler(shipper.handler if shipper else sink)
+        sink.close()
+    result["dropped"] = shipper.handler.dropped if shipper else 0
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--streams", type=int, default=50)
+    parser.add_argument("--frames", type=int, default=2000, help="SSE frames per stream")
+    parser.add_argument("--pingers", type=int, default=8, help="clients generating access-log traffic")
+    parser.add_argument("--sink-delay-ms", type=float, default=1.0, help="time the log sink blocks per record")
+    parser.add_argument("--port", type=int, default=9106)
+    args = parser.parse_args()
+
+    print(f"{args.streams} streams x {args.frames} frames, {args.pingers} pingers, log sink {args.sink_delay_ms}ms/record")
+    print(f"{'mode':<8} {'frames/s':>10} {'stream p50 s':>12} {'stream p99 s':>12} {'pings/s':>8} {'dropped':>8}")
+    for offset, mode in enumerate(("legacy", "asgi")):
+        result = run_mode(mode, args, args.port + offset)
+        print(
+            f"{mode:<8} {result['frames_per_s']:>10.0f} {result['stream_p50']:>12.2f} {result['stream_p99']:>12.2f} "
+            f"{result['pings_per_s']:>8.0f} {result['dropped']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
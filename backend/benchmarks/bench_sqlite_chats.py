@@ -0,0 +1,110 @@
+"""Hundreds of concurrent chats against a single SQLite file: WAL plus one writer vs. the previous setup.
+
+Starts the fake provider and the backend (uvicorn, one worker) as subprocesses on a fresh SQLite
+file, then runs --chats users at once. Each one creates a chat, streams --turns replies and reads
+the history and chat list after every turn. "legacy" runs with SQLITE_WAL_ENABLED=false, which
+is the rollback journal with a pool of connections all writing; "wal" is the new default.
+
+Usage (from backend/): python -m benchmarks.bench_sqlite_chats --chats 300 --turns 3
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.fake_provider import FakeProviderConfig
+from benchmarks.harness import BenchStack, backend_env, percentile, seed_users
+
+
+async def drive(base_url: str, tokens: list[str], turns: int) -> tuple[dict[str, list[float]], dict[str, int], float]:
+    latencies: dict[str, list[float]] = defaultdict(list)
+    failures: dict[str, int] = defaultdict(int)
+    limits = httpx.Limits(max_connections=len(tokens) * 2, max_keepalive_connections=len(tokens) * 2)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+
+        async def timed(name: str, call) -> httpx.Response | None:
+            started = time.perf_counter()
+            try:
+                response = await call()
+            except httpx.HTTPError:
+                failures[name] += 1
+                return None
+            if response.status_code != 200:
+                failures[name] += 1
+                return None
+            latencies[name].append(time.perf_counter() - started)
+            return response
+
+        async def stream_turn(headers: dict[str, str], chat_id: int, turn: int) -> httpx.Response:
+            payload = {"conversation_id": chat_id, "message": f"turn {turn}: tell me something"}
+            async with client.stream("POST", "/api/chat/send/stream", json=payload, headers=headers) as response:
+                body = await response.aread()
+            if b'data: {"type":"done"}' not in body:
+                # The stream itself is a 200; a failed turn ends with an error frame instead of done.
+                return httpx.Response(500)
+            return response
+
+        async def chat(token: str) -> None:
+            headers = {"Authorization": f"Bearer {token}"}
+            created = await timed("create", lambda: client.post("/api/chat/new", json={}, headers=headers))
+            if created is None:
+                return
+            chat_id = created.json()["id"]
+            for turn in range(turns):
+                await timed("stream", lambda: stream_turn(headers, chat_id, turn))
+                await timed("history", lambda: client.get(f"/api/chat/history/{chat_id}", headers=headers))
+                await timed("list", lambda: client.get("/api/chat/list", headers=headers))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(chat(token) for token in tokens))
+        elapsed = time.perf_counter() - started
+    return latencies, failures, elapsed
+
+
+def run_mode(mode: str, args: argparse.Namespace) -> None:
+    workdir = tempfile.mkdtemp(prefix="nova_sqlite_bench_")
+    database_url = f"sqlite+aiosqlite:///{os.path.join(workdir, 'nova.db')}"
+    tokens = seed_users(database_url, args.chats)
+
+    provider = FakeProviderConfig(ttft=args.ttft, tokens_per_second=args.tokens_per_second, reply_tokens=args.reply_tokens)
+    env = backend_env(database_url, f"http://127.0.0.1:{args.provider_port}", args.chats, SQLITE_WAL_ENABLED="true" if mode == "wal" else "false")
+    with BenchStack(env, provider, args.port, args.provider_port, workdir=workdir) as stack:
+        latencies, failures, elapsed = asyncio.run(drive(stack.url, tokens, args.turns))
+
+    locked = stack.log_text().count("database is locked")
+    total_ok = sum(len(values) for values in latencies.values())
+    total_failed = sum(failures.values())
+    print(f"\n{mode}: {args.chats} concurrent chats x {args.turns} turns in {elapsed:.1f}s, {total_ok} ok, {total_failed} failed, {locked} 'database is locked' errors logged")
+    print(f"{'operation':<10} {'ok':>6} {'failed':>7} {'p50 ms':>9} {'p99 ms':>9}")
+    for name in ("create", "stream", "history", "list"):
+        values = latencies.get(name, [])
+        p50 = statistics.median(values) * 1000 if values else 0.0
+        p99 = percentile(values, 0.99) * 1000 if values else 0.0
+        print(f"{name:<10} {len(values):>6} {failures.get(name, 0):>7} {p50:>9.1f} {p99:>9.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chats", type=int, default=300)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--mode", choices=("legacy", "wal", "both"), default="both")
+    parser.add_argument("--ttft", type=float, default=0.2)
+    parser.add_argument("--tokens-per-second", type=float, default=100.0)
+    parser.add_argument("--reply-tokens", type=int, default=40)
+    parser.add_argument("--port", type=int, default=9104)
+    parser.add_argument("--provider-port", type=int, default=9105)
+    args = parser.parse_args()
+
+    for mode in ("legacy", "wal") if args.mode == "both" else (args.mode,):
+        run_mode(mode, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""SSE encoding cost per streamed response: per-delta json.dumps vs. frame template vs. template + coalescing.
+
+Each response is pushed through a real StreamingResponse into a counting ASGI ``send``, so the
+per-frame cost of the response machinery is included, not just string formatting.
+
+Usage (from backend/): python -m benchmarks.bench_sse --responses 100 --tokens 1000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi.responses import StreamingResponse
+
+from app.core.llm_client import StreamChunk, StreamUsage
+from app.core.sse import DONE_FRAME, coalesce_chunks, token_frame
+
+WORDS = ["Sure", ",", " here", " is", " a", " longer", " answer", " with", " \"quotes\"", " and", " ünïcode", ".\n"]
+
+
+async def provider(tokens: int, burst: int, interval: float):
+    for index in range(tokens):
+        if index and index % burst == 0:
+            await asyncio.sleep(interval)
+        yield StreamChunk(content=WORDS[index % len(WORDS)])
+    yield StreamChunk(usage=StreamUsage(10, tokens, tokens + 10))
+
+
+async def legacy(source):
+    full_text = ""
+    async for chunk in source:
+        if chunk.content:
+            delta = chunk.content
+            full_text += delta
+            yield f"data: {json.dumps({'type': 'token', 'value': delta})}\n\n"
+    yield "data: {\"type\":\"done\"}\n\n"
+
+
+async def template(source):
+    parts: list[str] = []
+    async for chunk in source:
+        if chunk.content:
+            parts.append(chunk.content)
+            yield token_frame(chunk.content)
+    "".join(parts)
+    yield DONE_FRAME
+
+
+def coalesced(window: float, max_chars: int):
+    def encode(source):
+        return template(coalesce_chunks(source, window, max_chars))
+
+    return encode
+
+
+async def serve(encoder, tokens: int, burst: int, interval: float) -> tuple[int, int]:
+    frames = 0
+    size = 0
+
+    async def receive():
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal frames, size
+        if message["type"] == "http.response.body" and message.get("body"):
+            frames += 1
+            size += len(message["body"])
+
+    response = StreamingResponse(encoder(provider(tokens, burst, interval)), media_type="text/event-stream")
+    await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+    return frames, size
+
+
+async def run(encoder, responses: int, tokens: int, burst: int, interval: float) -> tuple[float, float, int, int]:
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    results = await asyncio.gather(*(serve(encoder, tokens, burst, interval) for _ in range(responses)))
+    return time.process_time() - cpu, time.perf_counter() - wall, sum(r[0] for r in results), sum(r[1] for r in results)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--responses", type=int, default=100, help="concurrent streamed responses")
+    parser.add_argument("--tokens", type=int, default=1000, help="deltas per response")
+    parser.add_argument("--burst", type=int, default=4, help="deltas the provider sends back to back")
+    parser.add_argument("--interval-ms", type=float, default=3.0, help="gap between provider bursts")
+    parser.add_argument("--window-ms", type=float, default=15.0)
+    parser.add_argument("--max-chars", type=int, default=256)
+    args = parser.parse_args()
+
+    modes = {
+        "json.dumps": legacy,
+        "template": template,
+        f"coalesce {args.window_ms:g}ms": coalesced(args.window_ms / 1000, args.max_chars),
+    }
+    print(f"{args.responses} concurrent responses x {args.tokens} deltas, bursts of {args.burst} every {args.interval_ms:g}ms")
+    print(f"{'encoder':<16} {'frames/resp':>11} {'KiB/resp':>9} {'CPU ms/resp':>12} {'frames/CPU s':>13} {'wall s':>7}")
+    for name, encoder in modes.items():
+        cpu, wall, frames, size = asyncio.run(run(encoder, args.responses, args.tokens, args.burst, args.interval_ms / 1000))
+        print(
+            f"{name:<16} {frames / args.responses:>11.0f} {size / args.responses / 1024:>9.1f} "
+            f"{cpu / args.responses * 1000:>12.2f} {frames / cpu:>13.0f} {wall:>7.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Usage dashboard queries: aggregating usage_logs on every call vs. reading the usage_daily rollup.
+
+Seeds a SQLite database with synthetic usage_logs (one heavy user owns --heavy-share of the rows),
+builds the rollup the same way the 0004 migration backfills it, then times both query shapes.
+
+Usage (from backend/): python -m benchmarks.bench_usage_rollup --rows 10000000 --db /tmp/nova_usage_bench.db
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine
+
+import app.models  # noqa: F401  (registers every table on Base.metadata)
+from app.db.base import Base
+
+MODELS = ("gpt-4o-mini", "gpt-4o", "gemini-2.5-flash")
+
+BACKFILL_SQL = """
+INSERT INTO usage_daily (user_id, day, model, requests, prompt_tokens, completion_tokens, total_tokens, estimated_cost_usd)
+SELECT user_id, DATE(created_at), model, COUNT(*), SUM(prompt_tokens), SUM(completion_tokens), SUM(total_tokens), SUM(estimated_cost_usd)
+FROM usage_logs
+GROUP BY user_id, DATE(created_at), model
+"""
+
+QUERIES = {
+    "summary from usage_logs": (
+        "SELECT COALESCE(SUM(prompt_tokens), 0), COALESCE(SUM(completion_tokens), 0), COALESCE(SUM(total_tokens), 0), "
+        "COALESCE(SUM(estimated_cost_usd), 0) FROM usage_logs WHERE user_id = ?"
+    ),
+    "summary from usage_daily": (
+        "SELECT COALESCE(SUM(prompt_tokens), 0), COALESCE(SUM(completion_tokens), 0), COALESCE(SUM(total_tokens), 0), "
+        "COALESCE(SUM(estimated_cost_usd), 0) FROM usage_daily WHERE user_id = ?"
+    ),
+    "30 days by day from usage_logs": (
+        "SELECT DATE(created_at), COUNT(*), SUM(total_tokens), SUM(estimated_cost_usd) FROM usage_logs "
+        "WHERE user_id = ? AND created_at >= ? GROUP BY DATE(created_at) ORDER BY 1"
+    ),
+    "30 days by day from usage_daily": (
+        "SELECT day, SUM(requests), SUM(total_tokens), SUM(estimated_cost_usd) FROM usage_daily "
+        "WHERE user_id = ? AND day >= ? GROUP BY day ORDER BY day"
+    ),
+}
+
+
+def seed(path: str, rows: int, users: int, heavy_share: float, days: int) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+    rng = random.Random(42)
+    today = date.today()
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=OFF")
+    connection.executemany(
+        "INSERT INTO users (id, email, hashed_password, is_active, is_admin) VALUES (?, ?, 'x', 1, 0)",
+        ((user_id, f"user{user_id}@bench") for user_id in range(1, users + 1)),
+    )
+
+    def generate():
+        for _ in range(rows):
+            user_id = 1 if rng.random() < heavy_share else rng.randint(2, users)
+            day = today - timedelta(days=rng.randrange(days))
+            created_at = f"{day.isoformat()} {rng.randrange(24):02d}:{rng.randrange(60):02d}:00"
+            prompt_tokens = rng.randint(50, 2000)
+            completion_tokens = rng.randint(10, 700)
+            total_tokens = prompt_tokens + completion_tokens
+            yield (user_id, MODELS[rng.randrange(len(MODELS))], prompt_tokens, completion_tokens, total_tokens, round(total_tokens * 0.00015 / 1000, 4), 0, created_at, created_at)
+
+    connection.executemany(
+        "INSERT INTO usage_logs (user_id, model, prompt_tokens, completion_tokens, total_tokens, estimated_cost_usd, cached, created_at, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        generate(),
+    )
+    connection.commit()
+    connection.execute(BACKFILL_SQL)
+    connection.commit()
+    connection.close()
+
+
+def time_query(connection: sqlite3.Connection, sql: str, params: tuple, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        connection.execute(sql, params).fetchall()
+        samples.append(time.perf_counter() - begin)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--heavy-share", type=float, default=0.2, help="fraction of rows owned by user 1")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", default="nova_usage_bench.db")
+    parser.add_argument("--reuse", action="store_true", help="skip seeding if the database file already exists")
+    args = parser.parse_args()
+
+    if not (args.reuse and os.path.exists(args.db)):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+        begin = time.perf_counter()
+        seed(args.db, args.rows, args.users, args.heavy_share, args.days)
+        print(f"seeded {args.rows} usage_logs rows in {time.perf_counter() - begin:.1f}s")
+
+    connection = sqlite3.connect(args.db)
+    log_rows = connection.execute("SELECT COUNT(*) FROM usage_logs WHERE user_id = 1").fetchone()[0]
+    rollup_rows = connection.execute("SELECT COUNT(*) FROM usage_daily WHERE user_id = 1").fetchone()[0]
+    since = (date.today() - timedelta(days=29)).isoformat()
+    print(f"heavy user: {log_rows} usage_logs rows, {rollup_rows} usage_daily rows")
+    print(f"{'query':<34} {'median ms':>10} {'max ms':>9}")
+    for name, sql in QUERIES.items():
+        params = (1, since) if sql.count("?") == 2 else (1,)
+        samples = time_query(connection, sql, params, args.repeat)
+        print(f"{name:<34} {statistics.median(samples) * 1000:>10.2f} {max(samples) * 1000:>9.2f}")
+    connection.close()
+
+
+if __name__ == "__main__":
+    main()
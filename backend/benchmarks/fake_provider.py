@@ -0,0 +1,175 @@
+"""Local stand-in for the OpenAI and Gemini chat endpoints, with injectable latency and errors.
+
+Point the backend at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1 and
+GEMINI_BASE_URL=http://127.0.0.1:<port>/v1beta. Run standalone with:
+
+    python -m benchmarks.fake_provider --port 9100 --ttft 0.2 --tail-ratio 0.05 --tail-delay 3
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+@dataclass
+class FakeProviderConfig:
+    ttft: float = 0.2  # seconds before the first token
+    tail_ratio: float = 0.0  # fraction of requests that stall before answering
+    tail_delay: float = 3.0
+    tokens_per_second: float = 200.0
+    reply_tokens: int = 40
+    error_ratio: float = 0.0  # fraction of requests answered with a 503
+    seed: int | None = None
+
+
+class FakeProvider:
+    def __init__(self, config: FakeProviderConfig | None = None) -> None:
+        self.config = config or FakeProviderConfig()
+        self.random = random.Random(self.config.seed)
+        self.requests = 0
+        self.app = self._build_app()
+
+    def first_token_delay(self) -> float:
+        delay = self.config.ttft * self.random.uniform(0.8, 1.2)
+        if self.random.random() < self.config.tail_ratio:
+            delay += self.config.tail_delay
+        return delay
+
+    def failed(self) -> bool:
+        return self.random.random() < self.config.error_ratio
+
+    def reply_words(self, messages: list[str]) -> list[str]:
+        seed = (messages[-1] if messages else "hello").split() or ["hello"]
+        return [seed[i % len(seed)] for i in range(self.config.reply_tokens)]
+
+    async def words(self, messages: list[str]):
+        await asyncio.sleep(self.first_token_delay())
+        gap = 1.0 / self.config.tokens_per_second if self.config.tokens_per_second > 0 else 0.0
+        for index, word in enumerate(self.reply_words(messages)):
+            if index and gap:
+                await asyncio.sleep(gap)
+            yield word if index == 0 else f" {word}"
+
+    def usage(self, messages: list[str]) -> tuple[int, int]:
+        prompt = sum(len(text) for text in messages) // 4 + 1
+        return prompt, self.config.reply_tokens
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+        unavailable = JSONResponse(status_code=503, content={"error": {"message": "fake provider overloaded"}})
+
+        @app.head("/v1/models")
+        @app.head("/v1beta/models")
+        async def models():
+            return JSONResponse({})
+
+        @app.post("/v1/chat/completions")
+        async def openai_chat(request: Request):
+            self.requests += 1
+            body = await request.json()
+            if self.failed():
+                return unavailable
+            texts = [m.get("content") or "" for m in body.get("messages", [])]
+            prompt_tokens, completion_tokens = self.usage(texts)
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+            base = {"id": "chatcmpl-fake", "created": int(time.time()), "model": body.get("model", "fake")}
+
+            if not body.get("stream"):
+                content = "".join([word async for word in self.words(texts)])
+                choice = {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+                return JSONResponse({**base, "object": "chat.completion", "choices": [choice], "usage": usage})
+
+            async def events():
+                async for word in self.words(texts):
+                    chunk = {**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]}
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                yield f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage})}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        @app.post("/v1beta/models/{target}")
+        async def gemini(target: str, request: Request):
+            self.requests += 1
+            body = await request.json()
+            if self.failed():
+                return unavailable
+            texts = [part.get("text", "") for item in body.get("contents", []) for part in item.get("parts", [])]
+            prompt_tokens, completion_tokens = self.usage(texts)
+            usage = {"promptTokenCount": prompt_tokens, "candidatesTokenCount": completion_tokens, "totalTokenCount": prompt_tokens + completion_tokens}
+
+            def frame(text: str) -> dict:
+                return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+
+            if target.endswith(":generateContent"):
+                content = "".join([word async for word in self.words(texts)])
+                return JSONResponse({**frame(content), "usageMetadata": usage})
+
+            async def events():
+                async for word in self.words(texts):
+                    yield f"data: {json.dumps(frame(word))}\n\n"
+                yield f"data: {json.dumps({**frame(''), 'usageMetadata': usage})}\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        return app
+
+
+class FakeProviderServer:
+    """Runs a FakeProvider under uvicorn on a background thread."""
+
+    def __init__(self, provider: FakeProvider, host: str = "127.0.0.1", port: int = 9100) -> None:
+        self.provider = provider
+        self.host = host
+        self.port = port
+        self.server = uvicorn.Server(uvicorn.Config(provider.app, host=host, port=port, log_level="warning", lifespan="off"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def __enter__(self) -> "FakeProviderServer":
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.should_exit = True
+        self.thread.join()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--ttft", type=float, default=0.2)
+    parser.add_argument("--tail-ratio", type=float, default=0.0)
+    parser.add_argument("--tail-delay", type=float, default=3.0)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--reply-tokens", type=int, default=40)
+    parser.add_argument("--error-ratio", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = FakeProviderConfig(
+        ttft=args.ttft,
+        tail_ratio=args.tail_ratio,
+        tail_delay=args.tail_delay,
+        tokens_per_second=args.tokens_per_second,
+        reply_tokens=args.reply_tokens,
+        error_ratio=args.error_ratio,
+    )
+    uvicorn.run(FakeProvider(config).app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
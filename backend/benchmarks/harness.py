@@ -0,0 +1,156 @@
+"""Shared plumbing for end-to-end benchmarks: a seeded database, plus the fake provider and backend as subprocesses.
+
+The backend and the seeding step run from scratch directories, so a developer's backend/.env does not
+leak into a run; the backend's configuration comes from the environment built by ``backend_env``.
+"""
+
+import asyncio
+import dataclasses
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.fake_provider import FakeProviderConfig
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+SECRET_KEY = "benchmark-secret"
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def seed_users(database_url: str, users: int) -> list[str]:
+    """Create the schema and ``users`` users directly, and mint their access tokens without going through bcrypt.
+
+    Runs in a subprocess from a scratch directory, like the backend, so it never reads a local .env either.
+    """
+    env = {**os.environ, "PYTHONPATH": str(BACKEND_DIR), "SECRET_KEY": SECRET_KEY, "DATABASE_URL": database_url}
+    command = [sys.executable, "-m", "benchmarks.harness", database_url, str(users)]
+    output = subprocess.run(command, cwd=tempfile.mkdtemp(prefix="nova_seed_"), env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def _seed(database_url: str, users: int) -> list[str]:
+    from sqlalchemy import create_engine, insert, make_url
+
+    import app.models  # noqa: F401  (registers every table on Base.metadata)
+    from app.core.security import create_access_token
+    from app.db.base import Base
+    from app.models.user import User
+
+    url = make_url(database_url)
+    engine = create_engine(url.set(drivername=url.get_backend_name()))
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(User), [{"id": i, "email": f"user{i}@bench.dev", "hashed_password": "x"} for i in range(1, users + 1)])
+    engine.dispose()
+    return [create_access_token(str(i)) for i in range(1, users + 1)]
+
+
+def backend_env(database_url: str, provider_url: str, concurrency: int, **overrides: str) -> dict[str, str]:
+    """Environment for a backend talking to the fake provider, with limits sized for ``concurrency`` clients."""
+    return {
+        **os.environ,
+        "PYTHONPATH": str(BACKEND_DIR),
+        "SECRET_KEY": SECRET_KEY,
+        "DATABASE_URL": database_url,
+        "OPENAI_API_KEY": "fake",
+        "GEMINI_API_KEY": "fake",
+        "OPENAI_BASE_URL": f"{provider_url}/v1",
+        "GEMINI_BASE_URL": f"{provider_url}/v1beta",
+        "PROVIDER_WARMUP": "false",
+        "PROVIDER_MAX_CONNECTIONS": str(concurrency * 2),
+        "PROVIDER_MAX_KEEPALIVE_CONNECTIONS": str(concurrency),
+        "LLM_MAX_CONCURRENCY": str(concurrency * 2),
+        "LLM_MAX_QUEUE": str(concurrency * 2),
+        "RATE_LIMIT_PER_MINUTE": "100000",
+        "RATE_LIMIT_TOKENS_PER_MINUTE": "100000000",
+        **overrides,
+    }
+
+
+def provider_command(config: FakeProviderConfig, port: int) -> list[str]:
+    command = [sys.executable, "-m", "benchmarks.fake_provider", "--port", str(port)]
+    for field in dataclasses.fields(config):
+        value = getattr(config, field.name)
+        if field.name != "seed" and value is not None:
+            command += [f"--{field.name.replace('_', '-')}", str(value)]
+    return command
+
+
+async def wait_ready(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"{url} exited with {process.returncode}")
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up")
+
+
+class BenchStack:
+    """Fake provider plus one uvicorn backend worker, each in its own process.
+
+    Use as a context manager; ``url`` is the backend's base URL and ``log_path`` collects its output.
+    """
+
+    def __init__(self, env: dict[str, str], provider: FakeProviderConfig, port: int, provider_port: int, workdir: str | None = None) -> None:
+        self.env = env
+        self.provider = provider
+        self.port = port
+        self.provider_port = provider_port
+        self.workdir = workdir or tempfile.mkdtemp(prefix="nova_bench_")
+        self.log_path = os.path.join(self.workdir, "backend.log")
+        self._processes: list[subprocess.Popen] = []
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def provider_url(self) -> str:
+        return f"http://127.0.0.1:{self.provider_port}"
+
+    def __enter__(self) -> "BenchStack":
+        backend_command = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(self.port)]
+        backend_command += ["--log-level", "warning", "--no-access-log", "--timeout-keep-alive", "60"]
+        self._log = open(self.log_path, "w")
+        provider = subprocess.Popen(
+            provider_command(self.provider, self.provider_port), cwd=BACKEND_DIR, env=self.env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        self._processes.append(provider)
+        backend = subprocess.Popen(backend_command, cwd=self.workdir, env=self.env, stdout=self._log, stderr=subprocess.STDOUT)
+        self._processes.append(backend)
+        try:
+            asyncio.run(wait_ready(f"{self.provider_url}/docs", provider))
+            asyncio.run(wait_ready(f"{self.url}/", backend))
+        except BaseException:
+            self.__exit__()
+            raise
+        return self
+
+    def __exit__(self, *exc) -> None:
+        for process in reversed(self._processes):
+            process.terminate()
+            process.wait()
+        self._processes.clear()
+        self._log.close()
+
+    def log_text(self) -> str:
+        return Path(self.log_path).read_text(errors="replace")
+
+
+if __name__ == "__main__":
+    print(json.dumps(_seed(sys.argv[1], int(sys.argv[2]))))
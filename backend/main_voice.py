@@ -28,6 +28,7 @@ async def main() -> None:
         password=os.getenv("VOICE_USER_PASSWORD", ""),
         wake_word=os.getenv("VOICE_WAKE_WORD", "hey nova"),
         default_model=os.getenv("VOICE_DEFAULT_MODEL", "gemini-2.5-flash"),
+        client_key=os.getenv("VOICE_CLIENT_KEY", ""),
     )
 
     stt = DeepgramSpeechToText(
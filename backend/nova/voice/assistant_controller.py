@@ -21,6 +21,7 @@ class VoiceConfig:
     password: str
     wake_word: str = "hey nova"
     default_model: str = "gemini-2.5-flash"
+    client_key: str = ""
 
 
 class VoiceAssistantController:
@@ -32,7 +33,9 @@ class VoiceAssistantController:
         self.tts = tts
         self.commands = CommandHandler()
 
-        self._http = httpx.AsyncClient(timeout=120)
+        # Sent on every request, including the streamed turns, so the backend admits them at voice priority.
+        client_headers = {"X-Voice-Key": config.client_key} if config.client_key else None
+        self._http = httpx.AsyncClient(timeout=120, headers=client_headers)
         self._token: str | None = None
         self._conversation_id: int | None = None
         self._model = config.default_model
@@ -1,15 +1,46 @@
-import { useEffect, useRef } from "react";
+import { useLayoutEffect, useRef } from "react";
 import MessageBubble from "./MessageBubble";
 
-export default function ChatWindow({ messages, isStreaming }) {
+const messageKey = (msg) => (msg ? msg.localId || msg.id : null);
+
+export default function ChatWindow({ messages, isStreaming, hasOlder, onLoadOlder }) {
+  const containerRef = useRef(null);
   const bottomRef = useRef(null);
+  const edgesRef = useRef({ first: null, last: null });
+  const heightRef = useRef(0);
 
-  useEffect(() => {
-    bottomRef.current?.scrollIntoView({ behavior: "auto", block: "end" });
+  useLayoutEffect(() => {
+    const first = messageKey(messages[0]);
+    const last = messageKey(messages[messages.length - 1]);
+    const prepended = last === edgesRef.current.last && first !== edgesRef.current.first;
+    const container = containerRef.current;
+    if (prepended && container && heightRef.current) {
+      container.scrollTop += container.scrollHeight - heightRef.current;
+    } else {
+      bottomRef.current?.scrollIntoView({ behavior: "auto", block: "end" });
+    }
+    edgesRef.current = { first, last };
+    heightRef.current = 0;
   }, [messages, isStreaming]);
 
+  function loadOlder() {
+    heightRef.current = containerRef.current?.scrollHeight || 0;
+    onLoadOlder();
+  }
+
+  function handleScroll(event) {
+    if (hasOlder && event.currentTarget.scrollTop < 80) loadOlder();
+  }
+
   return (
-    <div className="flex-1 overflow-auto px-4 py-4 space-y-4">
+    <div ref={containerRef} onScroll={handleScroll} className="flex-1 overflow-auto px-4 py-4 space-y-4">
+      {hasOlder && (
+        <div className="flex justify-center">
+          <button onClick={loadOlder} className="rounded-xl border border-slate-300 dark:border-slate-600 px-4 py-1 text-sm text-slate-600 dark:text-slate-300">
+            Load older messages
+          </button>
+        </div>
+      )}
       {messages.length === 0 ? (
         <div className="animate-pulse rounded-2xl border border-dashed border-slate-300 dark:border-slate-600 p-8 text-center opacity-70">
           Start a conversation with Nova Bot.
@@ -1,12 +1,17 @@
 import { Edit2, Plus, Trash2 } from "lucide-react";
 
-export default function Sidebar({ chats, activeId, onCreate, onSelect, onRename, onDelete }) {
+export default function Sidebar({ chats, activeId, hasMore, onLoadMore, onCreate, onSelect, onRename, onDelete }) {
+  function handleScroll(event) {
+    const { scrollTop, scrollHeight, clientHeight } = event.currentTarget;
+    if (hasMore && scrollHeight - scrollTop - clientHeight < 80) onLoadMore();
+  }
+
   return (
     <aside className="w-full md:w-72 border-r border-slate-200 dark:border-slate-700 bg-slate-100/70 dark:bg-slate-900/40 p-3">
       <button onClick={onCreate} className="w-full flex items-center justify-center gap-2 rounded-xl bg-sky-600 px-4 py-2 text-white hover:bg-sky-500">
         <Plus size={16} /> New Chat
       </button>
-      <div className="mt-4 space-y-2 max-h-[70vh] overflow-auto pr-1">
+      <div onScroll={handleScroll} className="mt-4 space-y-2 max-h-[70vh] overflow-auto pr-1">
         {chats.map((chat) => (
           <div key={chat.id} className={`rounded-xl p-2 border ${activeId === chat.id ? "bg-sky-100 text-slate-900 border-sky-200 dark:bg-sky-900/40 dark:text-slate-100 dark:border-sky-800/60" : "bg-white text-slate-900 border-slate-200 dark:bg-slate-800 dark:text-slate-100 dark:border-slate-700"}`}>
             <button onClick={() => onSelect(chat.id)} className="w-full text-left text-sm font-medium truncate">
@@ -18,6 +23,11 @@ export default function Sidebar({ chats, activeId, onCreate, onSelect, onRename,
             </div>
           </div>
         ))}
+        {hasMore && (
+          <button onClick={onLoadMore} className="w-full rounded-xl border border-slate-300 dark:border-slate-600 px-4 py-2 text-sm text-slate-600 dark:text-slate-300 hover:bg-white/60 dark:hover:bg-slate-800/60">
+            Load more chats
+          </button>
+        )}
       </div>
     </aside>
   );
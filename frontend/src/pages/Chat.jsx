@@ -26,8 +26,10 @@ export default function Chat() {
   const [user, setUser] = useState(null);
   const [usage, setUsage] = useState(null);
   const [chats, setChats] = useState([]);
+  const [chatsCursor, setChatsCursor] = useState(null);
   const [activeChatId, setActiveChatId] = useState(null);
   const [messages, setMessages] = useState([]);
+  const [historyCursor, setHistoryCursor] = useState(null);
   const [input, setInput] = useState("");
   const [model, setModel] = useState("gpt-4o-mini");
   const [temperature, setTemperature] = useState(0.7);
@@ -38,6 +40,12 @@ export default function Chat() {
   const [isListening, setIsListening] = useState(false);
   const abortRef = useRef(null);
   const speechRef = useRef(null);
+  const pagingRef = useRef(false);
+  const activeChatRef = useRef(null);
+
+  useEffect(() => {
+    activeChatRef.current = activeChatId;
+  }, [activeChatId]);
 
   const activeChat = useMemo(() => chats.find((x) => x.id === activeChatId) || null, [chats, activeChatId]);
 
@@ -57,12 +65,13 @@ export default function Chat() {
 
   async function bootstrap() {
     try {
-      const [me, chatList, usageData] = await Promise.all([fetchMe(), listChats(), fetchUsage()]);
+      const [me, chatPage, usageData] = await Promise.all([fetchMe(), listChats(), fetchUsage()]);
       setUser(me);
       setUsage(usageData);
-      setChats(chatList);
-      if (chatList.length > 0) {
-        await selectChat(chatList[0].id);
+      setChats(chatPage.chats);
+      setChatsCursor(chatPage.before);
+      if (chatPage.chats.length > 0) {
+        await selectChat(chatPage.chats[0].id);
       } else {
         await handleNewChat();
       }
@@ -74,8 +83,9 @@ export default function Chat() {
 
   async function selectChat(chatId) {
     setActiveChatId(chatId);
-    const { conversation, messages: history } = await fetchHistory(chatId);
+    const { conversation, messages: history, before } = await fetchHistory(chatId);
     setMessages(history);
+    setHistoryCursor(before);
     const normalizedModel =
       conversation.model === "gemini-1.5-flash" || conversation.model === "gemini-1.5-flash-latest"
         ? "gemini-2.5-flash"
@@ -89,6 +99,55 @@ export default function Chat() {
     setChats((prev) => [created, ...prev]);
     setActiveChatId(created.id);
     setMessages([]);
+    setHistoryCursor(null);
+  }
+
+  async function loadPage(load) {
+    if (pagingRef.current) return;
+    pagingRef.current = true;
+    try {
+      await load();
+    } catch (err) {
+      setActionError(getErrorMessage(err, "Loading failed."));
+    } finally {
+      pagingRef.current = false;
+    }
+  }
+
+  function loadMoreChats() {
+    if (!chatsCursor) return;
+    loadPage(async () => {
+      const page = await listChats(chatsCursor);
+      setChats((prev) => {
+        const ids = new Set(prev.map((x) => x.id));
+        return [...prev, ...page.chats.filter((x) => !ids.has(x.id))];
+      });
+      setChatsCursor(page.before);
+    });
+  }
+
+  function loadOlderMessages() {
+    if (!historyCursor || !activeChatId) return;
+    const chatId = activeChatId;
+    loadPage(async () => {
+      const page = await fetchHistory(chatId, historyCursor);
+      if (chatId !== activeChatRef.current) return;
+      setMessages((prev) => [...page.messages, ...prev]);
+      setHistoryCursor(page.before);
+    });
+  }
+
+  async function refreshAfterReply() {
+    const [refreshed, usageData, chatPage] = await Promise.all([fetchHistory(activeChatId), fetchUsage(), listChats()]);
+    setMessages((prev) => {
+      const ids = new Set(refreshed.messages.map((m) => m.id));
+      return [...prev.filter((m) => m.id && !ids.has(m.id)), ...refreshed.messages];
+    });
+    setUsage(usageData);
+    setChats((prev) => {
+      const ids = new Set(chatPage.chats.map((x) => x.id));
+      return [...chatPage.chats, ...prev.filter((x) => !ids.has(x.id))];
+    });
   }
 
   function getErrorMessage(err, fallback) {
@@ -197,11 +256,7 @@ export default function Chat() {
         },
         async () => {
           setIsStreaming(false);
-          const refreshed = await fetchHistory(activeChatId);
-          setMessages(refreshed.messages);
-          const [usageData, chatsData] = await Promise.all([fetchUsage(), listChats()]);
-          setUsage(usageData);
-          setChats(chatsData);
+          await refreshAfterReply();
         },
         (error) => {
           setIsStreaming(false);
@@ -224,11 +279,7 @@ export default function Chat() {
     if (!lastUser) return;
     try {
       await sendChat({ conversation_id: activeChatId, message: lastUser.content, model, temperature, max_tokens: maxTokens, system_prompt: systemPrompt });
-      const refreshed = await fetchHistory(activeChatId);
-      setMessages(refreshed.messages);
-      const [usageData, chatsData] = await Promise.all([fetchUsage(), listChats()]);
-      setUsage(usageData);
-      setChats(chatsData);
+      await refreshAfterReply();
     } catch (err) {
       setActionError(getErrorMessage(err, "Regenerate failed."));
     }
@@ -251,9 +302,18 @@ export default function Chat() {
         onLogout={logout}
       />
       <div className="flex flex-col md:flex-row h-[calc(100vh-73px)]">
-        <Sidebar chats={chats} activeId={activeChatId} onCreate={handleNewChat} onSelect={selectChat} onRename={handleRename} onDelete={handleDelete} />
+        <Sidebar
+          chats={chats}
+          activeId={activeChatId}
+          hasMore={Boolean(chatsCursor)}
+          onLoadMore={loadMoreChats}
+          onCreate={handleNewChat}
+          onSelect={selectChat}
+          onRename={handleRename}
+          onDelete={handleDelete}
+        />
         <main className="flex-1 flex flex-col">
-          <ChatWindow messages={messages} isStreaming={isStreaming} />
+          <ChatWindow messages={messages} isStreaming={isStreaming} hasOlder={Boolean(historyCursor)} onLoadOlder={loadOlderMessages} />
           <div className="border-t border-slate-200 dark:border-slate-700 p-3 space-y-2">
             {actionError && <p className="text-sm text-rose-600">{actionError}</p>}
             <div className="flex flex-wrap gap-2">
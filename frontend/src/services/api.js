@@ -51,9 +51,9 @@ export async function createChat(payload) {
   return data;
 }
 
-export async function listChats() {
-  const { data } = await api.get("/chat/list");
-  return data;
+export async function listChats(before = null) {
+  const { data, headers } = await api.get("/chat/list", { params: before ? { before } : {} });
+  return { chats: data, before: headers["x-before-cursor"] || null };
 }
 
 export async function renameChat(chatId, title) {
@@ -66,8 +66,8 @@ export async function deleteChat(chatId) {
   return data;
 }
 
-export async function fetchHistory(chatId) {
-  const { data } = await api.get(`/chat/history/${chatId}`);
+export async function fetchHistory(chatId, before = null) {
+  const { data } = await api.get(`/chat/history/${chatId}`, { params: before ? { before } : {} });
   return data;
 }
 